@@ -1,9 +1,10 @@
-from src.database import engine
+from src.database import engine, upgrade_db
 from src.models.tables import Base
 
 def init_database():
     print("Creating database tables...")
     Base.metadata.create_all(bind=engine)
+    upgrade_db()
     print("Database tables created successfully!")
 
 if __name__ == "__main__":
@@ -3,12 +3,16 @@ from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
+import asyncio
 import logging
 import time
 from typing import Callable
 from .config import settings
 from .routes import downloads, queue, system, tags, websocket
 from .database import check_db_connection
+from .openapi import setup_openapi
+from .services.audit import audit_log_writer
+from .services.download_service import torrent_status_scope
 
 logger = logging.getLogger(__name__)
 
@@ -48,6 +52,9 @@ def create_app() -> FastAPI:
     app.include_router(tags.router, prefix="/api")
     app.include_router(websocket.router, prefix="/api")
 
+    # Serve the cached OpenAPI schema
+    setup_openapi(app)
+
     # Add middleware for request logging and timing
     @app.middleware("http")
     async def log_requests(request: Request, call_next: Callable):
@@ -63,6 +70,12 @@ def create_app() -> FastAPI:
         
         return response
 
+    # Share torrent status lookups between service calls within one request
+    @app.middleware("http")
+    async def scope_torrent_status(request: Request, call_next: Callable):
+        with torrent_status_scope():
+            return await call_next(request)
+
     # Add error handlers
     @app.exception_handler(Exception)
     async def global_exception_handler(request: Request, exc: Exception):
@@ -128,10 +141,35 @@ def create_app() -> FastAPI:
             logger.error(f"Failed to initialize services: {e}")
             raise
 
+        # Sample system metrics off the request path
+        app.state.metrics_task = asyncio.create_task(system.metrics_sampler())
+        app.state.audit_task = asyncio.create_task(audit_log_writer())
+        app.state.status_task = asyncio.create_task(websocket.system_status_publisher())
+        app.state.heartbeat_task = asyncio.create_task(websocket.heartbeat_sender())
+
     # Add shutdown event handler
     @app.on_event("shutdown")
     async def shutdown_event():
         logger.info("Shutting down application")
+        metrics_task = getattr(app.state, "metrics_task", None)
+        if metrics_task:
+            metrics_task.cancel()
+        status_task = getattr(app.state, "status_task", None)
+        if status_task:
+            status_task.cancel()
+        heartbeat_task = getattr(app.state, "heartbeat_task", None)
+        if heartbeat_task:
+            heartbeat_task.cancel()
+        audit_task = getattr(app.state, "audit_task", None)
+        if audit_task:
+            # Let the writer flush queued audit entries before exiting
+            audit_task.cancel()
+            await asyncio.gather(audit_task, return_exceptions=True)
+        # Write out torrent mapping changes still waiting to be flushed
+        from .services_manager import services
+        download_service = services.get_existing_download_service()
+        if download_service:
+            await download_service.aclose()
         # Add cleanup code here if needed
 
     return app
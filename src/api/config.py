@@ -1,10 +1,25 @@
+import time
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
-from typing import Optional
+from typing import Any, Callable, Dict, Optional, Tuple
 from ..settings import settings, save_settings
 
 router = APIRouter(prefix="/api/config", tags=["config"])
 
+CONFIG_CACHE_TTL = 60.0  # seconds
+
+# View name -> (monotonic timestamp, response) of the read-only config views
+_config_cache: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+
+def _cached(key: str, build: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+    """Serve a config view from memory, rebuilding it once it is older than the TTL"""
+    cached = _config_cache.get(key)
+    if cached and time.monotonic() - cached[0] < CONFIG_CACHE_TTL:
+        return cached[1]
+    view = build()
+    _config_cache[key] = (time.monotonic(), view)
+    return view
+
 class UsenetConfig(BaseModel):
     server: str
     port: int
@@ -24,9 +39,7 @@ class SystemConfig(BaseModel):
     api_port: int
     log_level: str
 
-@router.get("/usenet")
-async def get_usenet_config():
-    """Get current Usenet configuration."""
+def _usenet_view() -> Dict[str, Any]:
     return {
         "server": settings.USENET_SERVER,
         "port": settings.USENET_PORT,
@@ -39,6 +52,11 @@ async def get_usenet_config():
         "max_retries": settings.USENET_MAX_RETRIES
     }
 
+@router.get("/usenet")
+async def get_usenet_config():
+    """Get current Usenet configuration."""
+    return _cached("usenet", _usenet_view)
+
 @router.put("/usenet")
 async def update_usenet_config(config: UsenetConfig):
     """Update Usenet configuration."""
@@ -73,15 +91,14 @@ async def update_usenet_config(config: UsenetConfig):
         settings.USENET_RETENTION = config.retention_days
         settings.USENET_RATE_LIMIT = config.download_rate_limit
         settings.USENET_MAX_RETRIES = config.max_retries
+        _config_cache.clear()
         
         return {"message": "Usenet configuration updated successfully"}
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to update configuration: {str(e)}")
 
-@router.get("/")
-async def get_config():
-    """Get basic configuration."""
+def _basic_view() -> Dict[str, Any]:
     return {
         "api_host": settings.API_HOST,
         "api_port": settings.API_PORT,
@@ -89,6 +106,11 @@ async def get_config():
         "max_concurrent_downloads": settings.MAX_CONCURRENT_DOWNLOADS
     }
 
+@router.get("/")
+async def get_config():
+    """Get basic configuration."""
+    return _cached("basic", _basic_view)
+
 @router.put("/")
 async def update_config(config_data: dict):
     """Update basic configuration."""
@@ -105,26 +127,15 @@ async def update_config(config_data: dict):
         # Update runtime settings
         for key, value in config_data.items():
             setattr(settings, key.upper(), value)
+        _config_cache.clear()
             
         return {"message": "Configuration updated successfully"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to update configuration: {str(e)}")
 
-@router.get("/system")
-async def get_system_config():
-    """Get all system configuration."""
+def _system_view() -> Dict[str, Any]:
     return {
-        "usenet": {
-            "server": settings.USENET_SERVER,
-            "port": settings.USENET_PORT,
-            "use_ssl": settings.USENET_SSL,
-            "username": settings.USENET_USERNAME,
-            "password": "***" if settings.USENET_PASSWORD else "",
-            "max_connections": settings.USENET_CONNECTIONS,
-            "retention_days": settings.USENET_RETENTION,
-            "download_rate_limit": settings.USENET_RATE_LIMIT,
-            "max_retries": settings.USENET_MAX_RETRIES
-        },
+        "usenet": _usenet_view(),
         "default_download_path": settings.DEFAULT_DOWNLOAD_PATH,
         "max_concurrent_downloads": settings.MAX_CONCURRENT_DOWNLOADS,
         "api_host": settings.API_HOST,
@@ -132,6 +143,11 @@ async def get_system_config():
         "log_level": settings.LOG_LEVEL
     }
 
+@router.get("/system")
+async def get_system_config():
+    """Get all system configuration."""
+    return _cached("system", _system_view)
+
 @router.post("/test-connection")
 async def test_connection(config: UsenetConfig):
     """Test Usenet server connection with provided configuration."""
@@ -287,21 +287,19 @@ async def add_nzb_file_upload(file: UploadFile = File(...), download_path: Optio
         
         # Check file size with configurable limit
         max_size_bytes = settings.MAX_NZB_FILE_SIZE_MB * 1024 * 1024
-        file_size = 0
-        file_content = b""
+        file_content = bytearray()
         
         # Read file in chunks to avoid memory issues
         while True:
-            chunk = await file.read(1024 * 1024)  # 1MB chunks
+            chunk = await file.read(64 * 1024)  # 64KB chunks
             if not chunk:
                 break
-            file_size += len(chunk)
-            if file_size > max_size_bytes:
+            file_content += chunk
+            if len(file_content) > max_size_bytes:
                 raise HTTPException(
                     status_code=413, 
                     detail=f"File too large. Maximum size for NZB files is {settings.MAX_NZB_FILE_SIZE_MB}MB."
                 )
-            file_content += chunk
         
         if len(file_content) == 0:
             raise HTTPException(status_code=400, detail="File is empty")
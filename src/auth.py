@@ -7,7 +7,10 @@ from passlib.context import CryptContext
 from pydantic import BaseModel
 from .config import settings
 from .database import get_db
+from .models.user import APIKey
 from sqlalchemy.orm import Session
+import hashlib
+import hmac
 import logging
 
 logger = logging.getLogger(__name__)
@@ -17,6 +20,7 @@ SECRET_KEY = settings.SECRET_KEY
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 REFRESH_TOKEN_EXPIRE_DAYS = 30
+API_KEY_PREFIX_LENGTH = 8
 
 # Password hashing
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -218,14 +222,33 @@ class APIKeyAuth:
         return True
 
 def is_valid_api_key(api_key: str, db: Session) -> bool:
-    """Validate API key"""
-    # This should be implemented based on your API key storage
-    # For now, just checking against settings
-    return api_key in [
+    """Validate API key against the configured media manager keys and user keys"""
+    if api_key in [
         settings.SONARR_API_KEY,
         settings.RADARR_API_KEY,
         settings.READARR_API_KEY
-    ]
+    ]:
+        return True
+    stored = get_api_key(db, api_key)
+    return stored is not None and (
+        stored.expires_at is None or stored.expires_at > datetime.utcnow()
+    )
+
+def hash_api_key(api_key: str) -> str:
+    """Return the SHA-256 digest stored in place of a raw API key"""
+    return hashlib.sha256(api_key.encode()).hexdigest()
+
+def get_api_key(db: Session, api_key: str) -> Optional[APIKey]:
+    """Look up a user API key by its raw value"""
+    digest = hash_api_key(api_key)
+    # The indexed prefix narrows the search to a handful of rows
+    candidates = db.query(APIKey).filter(
+        APIKey.key_prefix == api_key[:API_KEY_PREFIX_LENGTH]
+    )
+    for candidate in candidates:
+        if hmac.compare_digest(candidate.key_hash, digest):
+            return candidate
+    return None
 
 # API key requirements for different media managers
 require_sonarr_auth = APIKeyAuth(["sonarr"])
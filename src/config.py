@@ -29,6 +29,8 @@ class Settings(BaseSettings):
     MAX_CONCURRENT_DOWNLOADS: int = 3
     CHUNK_SIZE: int = 8192
     AUTO_EXTRACT: bool = True
+    MAX_NZB_FILE_SIZE_MB: int = 50
+    MAX_TORRENT_FILE_SIZE_MB: int = 20
     
     # Usenet settings
     USENET_SERVER: Optional[str] = None
@@ -63,6 +65,7 @@ class Settings(BaseSettings):
     
     # WebSocket settings
     WS_HEARTBEAT_INTERVAL: int = 30
+    SYSTEM_STATUS_INTERVAL: int = 5
     WS_MAX_CONNECTIONS: int = 100
     WS_MESSAGE_QUEUE_SIZE: int = 100
     
@@ -1,11 +1,11 @@
 import logging
 from contextlib import contextmanager
 from typing import Generator
-from sqlalchemy import create_engine, MetaData
+from sqlalchemy import create_engine, inspect, text, JSON, MetaData
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.pool import QueuePool
-from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.exc import DBAPIError, SQLAlchemyError
 from .config import settings
 
 logger = logging.getLogger(__name__)
@@ -57,15 +57,130 @@ def init_db() -> None:
     """Initialize database schema"""
     try:
         # Import all models to ensure they're registered
-        from .models import tables  # noqa
+        from .models import tables, user  # noqa
 
         # Create all tables
         Base.metadata.create_all(bind=engine)
+        upgrade_db()
         logger.info("Database initialized successfully")
     except Exception as e:
         logger.error(f"Failed to initialize database: {e}")
         raise
 
+# (table, index) pairs earlier releases created and the models no longer declare
+_RETIRED_INDEXES = (
+    # Covered by the primary key and idx_download_tags_tag_download
+    ("download_tags", "idx_download_tags_download_id"),
+    ("download_tags", "idx_download_tags_tag_id"),
+    ("download_tags", "idx_download_tags_composite"),
+    # Replaced by the (created_at, id) keyset index
+    ("downloads", "idx_downloads_created_at"),
+)
+
+def upgrade_db() -> None:
+    """Bring tables created by older releases up to date
+
+    create_all never alters existing tables, so columns, data and indexes introduced
+    after a table was first created are migrated here.
+    """
+    from .models import tables, user  # noqa
+
+    with engine.begin() as conn:
+        existing = set(inspect(conn).get_table_names())
+        if "downloads" in existing:
+            _upgrade_downloads(conn)
+        if "api_keys" in existing:
+            _upgrade_api_keys(conn)
+        if "audit_logs" in existing:
+            _upgrade_audit_logs(conn)
+        if "roles" in existing:
+            _upgrade_roles(conn)
+        _upgrade_indexes(conn, existing)
+        if conn.dialect.name == "postgresql":
+            _upgrade_trigram_indexes(conn)
+
+def _upgrade_downloads(conn) -> None:
+    """Add the queue position column"""
+    columns = {column["name"] for column in inspect(conn).get_columns("downloads")}
+    if "queue_position" not in columns:
+        logger.info("Adding downloads.queue_position column")
+        conn.execute(text("ALTER TABLE downloads ADD COLUMN queue_position INTEGER"))
+
+def _upgrade_api_keys(conn) -> None:
+    """Replace the plaintext key column with a hash and lookup prefix
+
+    Plaintext keys cannot be kept, and they never authenticated requests, so
+    the table is rebuilt empty and keys have to be issued again.
+    """
+    columns = {column["name"] for column in inspect(conn).get_columns("api_keys")}
+    if "key_hash" not in columns:
+        logger.warning("Dropping plaintext API keys; existing keys must be issued again")
+        table = Base.metadata.tables["api_keys"]
+        table.drop(conn)
+        table.create(conn)
+
+def _upgrade_audit_logs(conn) -> None:
+    """Add the outcome columns; earlier rows were all successful writes"""
+    columns = {column["name"] for column in inspect(conn).get_columns("audit_logs")}
+    if "success" not in columns:
+        logger.info("Adding audit_logs.success column")
+        conn.execute(text(
+            "ALTER TABLE audit_logs ADD COLUMN success BOOLEAN NOT NULL DEFAULT TRUE"
+        ))
+    if "error" not in columns:
+        logger.info("Adding audit_logs.error column")
+        conn.execute(text("ALTER TABLE audit_logs ADD COLUMN error TEXT"))
+
+def _upgrade_roles(conn) -> None:
+    """Turn the JSON-encoded permissions text into a JSON column"""
+    columns = {column["name"]: column for column in inspect(conn).get_columns("roles")}
+    if isinstance(columns["permissions"]["type"], JSON):
+        return
+    # SQLite keeps JSON as text, so the JSON type already decodes the old values
+    if conn.dialect.name == "postgresql":
+        logger.info("Converting roles.permissions to JSON")
+        conn.execute(text(
+            "ALTER TABLE roles ALTER COLUMN permissions TYPE JSON USING permissions::json"
+        ))
+    elif conn.dialect.name == "mysql":
+        logger.info("Converting roles.permissions to JSON")
+        conn.execute(text("ALTER TABLE roles MODIFY permissions JSON"))
+
+def _upgrade_indexes(conn, existing: set) -> None:
+    """Drop indexes earlier releases declared and create the ones the models declare now"""
+    for table_name, index_name in _RETIRED_INDEXES:
+        if table_name not in existing:
+            continue
+        if index_name in {index["name"] for index in inspect(conn).get_indexes(table_name)}:
+            logger.info(f"Dropping index {index_name}")
+            if conn.dialect.name == "mysql":
+                conn.execute(text(f"DROP INDEX {index_name} ON {table_name}"))
+            else:
+                conn.execute(text(f"DROP INDEX {index_name}"))
+    for table in Base.metadata.sorted_tables:
+        if table.name in existing:
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+
+def _upgrade_trigram_indexes(conn) -> None:
+    """Create the pg_trgm search indexes if the extension is, or can be, installed"""
+    from .models.tables import DOWNLOAD_NAME_TRGM_INDEX_SQL
+    from .models.user import USER_SEARCH_TRGM_INDEX_SQL
+
+    installed = conn.execute(
+        text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+    ).scalar()
+    if not installed:
+        # Installing an extension needs CREATE on the database, which an app role may lack
+        try:
+            with conn.begin_nested():
+                conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        except DBAPIError as e:
+            logger.warning(f"pg_trgm unavailable, searches will scan without trigram indexes: {e}")
+            return
+    conn.execute(text(DOWNLOAD_NAME_TRGM_INDEX_SQL))
+    conn.execute(text(USER_SEARCH_TRGM_INDEX_SQL))
+
 def check_db_connection() -> bool:
     """Check database connection health"""
     try:
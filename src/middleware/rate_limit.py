@@ -1,51 +1,75 @@
+import threading
 import time
-from typing import Dict, Optional, Tuple
-from fastapi import Request, HTTPException
+from typing import Dict, List, Optional, Tuple
 from fastapi.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 from ..config import settings
 
 class RateLimiter:
     """Rate limiting implementation using sliding window"""
+    SHARD_COUNT = 64  # must be a power of two
+    SHARD_MASK = SHARD_COUNT - 1
+
     def __init__(self, window_size: int = 60, max_requests: int = 100):
         self.window_size = window_size  # seconds
         self.max_requests = max_requests
-        self.requests: Dict[str, list] = {}  # client_id -> list of timestamps
+        self.limit_header = str(max_requests).encode()
+        # client_id -> list of timestamps, partitioned so no single dict grows
+        # large enough to stall on resize and each shard can be locked alone
+        self.shards: List[Dict[str, list]] = [{} for _ in range(self.SHARD_COUNT)]
+        self._locks: List[threading.Lock] = [
+            threading.Lock() for _ in range(self.SHARD_COUNT)
+        ]
+
+    def _shard_index(self, client_id: str) -> int:
+        """Get the shard index for a client"""
+        return hash(client_id) & self.SHARD_MASK
 
     def is_rate_limited(self, client_id: str) -> Tuple[bool, Optional[float]]:
         """Check if client is rate limited"""
         now = time.time()
-        
-        # Remove old requests outside the window
-        if client_id in self.requests:
-            self.requests[client_id] = [
-                ts for ts in self.requests[client_id]
+        index = self._shard_index(client_id)
+        bucket = self.shards[index]
+
+        with self._locks[index]:
+            # Remove old requests outside the window
+            timestamps = [
+                ts for ts in bucket.get(client_id, ())
                 if now - ts < self.window_size
             ]
-        else:
-            self.requests[client_id] = []
-        
-        # Check number of requests in window
-        if len(self.requests[client_id]) >= self.max_requests:
-            oldest_timestamp = min(self.requests[client_id])
-            retry_after = oldest_timestamp + self.window_size - now
-            return True, retry_after
-        
-        # Add new request
-        self.requests[client_id].append(now)
-        return False, None
+            bucket[client_id] = timestamps
+
+            # Check number of requests in window
+            if len(timestamps) >= self.max_requests:
+                oldest_timestamp = min(timestamps)
+                retry_after = oldest_timestamp + self.window_size - now
+                return True, retry_after
+
+            # Add new request
+            timestamps.append(now)
+            return False, None
 
     def get_remaining(self, client_id: str) -> int:
         """Get remaining requests in current window"""
-        if client_id not in self.requests:
-            return self.max_requests
-        
-        now = time.time()
-        current_requests = len([
-            ts for ts in self.requests[client_id]
-            if now - ts < self.window_size
-        ])
+        index = self._shard_index(client_id)
+        bucket = self.shards[index]
+
+        with self._locks[index]:
+            timestamps = bucket.get(client_id)
+            if timestamps is None:
+                return self.max_requests
+
+            now = time.time()
+            current_requests = len([
+                ts for ts in timestamps
+                if now - ts < self.window_size
+            ])
         return max(0, self.max_requests - current_requests)
 
+# Paths that bypass rate limiting: exact matches, then prefixes of whole route trees
+_EXEMPT_PATHS = frozenset({"/api/health"})
+_EXEMPT_PREFIXES = ("/api/ws",)
+
 # Create rate limiters for different client types
 authenticated_limiter = RateLimiter(
     window_size=60,
@@ -56,45 +80,66 @@ unauthenticated_limiter = RateLimiter(
     max_requests=settings.API_RATE_LIMIT // 10
 )
 
-async def rate_limit_middleware(request: Request, call_next):
-    """Middleware for rate limiting requests"""
-    # Skip rate limiting for WebSocket connections
-    if request.url.path.startswith("/api/ws"):
-        return await call_next(request)
-    
-    # Get client identifier
-    client_id = request.headers.get("Authorization", request.client.host)
-    
-    # Choose appropriate limiter
-    limiter = authenticated_limiter if "Authorization" in request.headers else unauthenticated_limiter
-    
-    # Check rate limit
-    is_limited, retry_after = limiter.is_rate_limited(client_id)
-    if is_limited:
-        return JSONResponse(
-            status_code=429,
-            content={
-                "detail": "Too many requests",
-                "retry_after": retry_after
-            },
-            headers={
-                "Retry-After": str(int(retry_after)),
-                "X-RateLimit-Limit": str(limiter.max_requests),
-                "X-RateLimit-Remaining": "0",
-                "X-RateLimit-Reset": str(int(time.time() + retry_after))
-            }
-        )
-    
-    # Add rate limit headers
-    response = await call_next(request)
-    remaining = limiter.get_remaining(client_id)
-    response.headers["X-RateLimit-Limit"] = str(limiter.max_requests)
-    response.headers["X-RateLimit-Remaining"] = str(remaining)
-    response.headers["X-RateLimit-Reset"] = str(
-        int(time.time() + limiter.window_size)
-    )
-    
-    return response
+class RateLimitMiddleware:
+    """ASGI middleware for rate limiting requests"""
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        # Skip rate limiting for WebSocket connections and health checks
+        path = scope["path"]
+        if path in _EXEMPT_PATHS or path.startswith(_EXEMPT_PREFIXES):
+            await self.app(scope, receive, send)
+            return
+
+        # Get client identifier
+        authorization = None
+        for name, value in scope["headers"]:
+            if name == b"authorization":
+                authorization = value.decode("latin-1")
+                break
+        client = scope.get("client")
+        client_id = authorization or (client[0] if client else "")
+
+        # Choose appropriate limiter
+        limiter = authenticated_limiter if authorization is not None else unauthenticated_limiter
+
+        # Check rate limit
+        is_limited, retry_after = limiter.is_rate_limited(client_id)
+        if is_limited:
+            response = JSONResponse(
+                status_code=429,
+                content={
+                    "detail": "Too many requests",
+                    "retry_after": retry_after
+                },
+                headers={
+                    "Retry-After": str(int(retry_after)),
+                    "X-RateLimit-Limit": str(limiter.max_requests),
+                    "X-RateLimit-Remaining": "0",
+                    "X-RateLimit-Reset": str(int(time.time() + retry_after))
+                }
+            )
+            await response(scope, receive, send)
+            return
+
+        async def send_with_headers(message: Message):
+            # Add rate limit headers
+            if message["type"] == "http.response.start":
+                remaining = limiter.get_remaining(client_id)
+                reset = int(time.time() + limiter.window_size)
+                message.setdefault("headers", []).extend((
+                    (b"x-ratelimit-limit", limiter.limit_header),
+                    (b"x-ratelimit-remaining", str(remaining).encode()),
+                    (b"x-ratelimit-reset", str(reset).encode())
+                ))
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
 
 class WebSocketRateLimiter:
     """Rate limiting for WebSocket connections"""
@@ -1,6 +1,7 @@
 from ..database import Base
 from .tables import DownloadTable, TagTable, download_tags
-from .download import Download, Tag, DownloadStatus, DownloadType
+from .schemas import Download, Tag
+from .enums import DownloadStatus, DownloadType
 
 __all__ = [
     'Base',
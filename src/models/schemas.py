@@ -75,6 +75,7 @@ class Download(DownloadBase):
     eta: Optional[str] = Field(None, max_length=50)
     error_message: Optional[str] = None
     tags: List[Tag] = []
+    queue_position: Optional[int] = None
     queued_at: Optional[datetime] = None
     started_at: Optional[datetime] = None
     completed_at: Optional[datetime] = None
@@ -103,5 +104,5 @@ class DownloadFilter(BaseModel):
 
 class DownloadSort(BaseModel):
     """Download sort schema"""
-    field: str = Field(..., regex='^(name|status|progress|created_at|updated_at)$')
-    direction: str = Field(..., regex='^(asc|desc)$')
+    field: str = Field(..., pattern='^(name|status|progress|created_at|updated_at)$')
+    direction: str = Field(..., pattern='^(asc|desc)$')
@@ -1,17 +1,43 @@
 from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Table, Enum, Text, Index, UniqueConstraint
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.orm import relationship
+from sqlalchemy.sql.expression import FunctionElement
 from datetime import datetime
 from ..database import Base
 from .enums import DownloadStatus, DownloadType, TagType
 
+class utcnow(FunctionElement):
+    """Current UTC time from the database clock, as a naive DateTime like datetime.utcnow()"""
+    type = DateTime()
+    inherit_cache = True
+
+@compiles(utcnow)
+def _utcnow_default(element, compiler, **kw):
+    return "CURRENT_TIMESTAMP"
+
+@compiles(utcnow, 'sqlite')
+def _utcnow_sqlite(element, compiler, **kw):
+    # Match the 'YYYY-MM-DD HH:MM:SS.ffffff' text SQLAlchemy stores for Python
+    # datetimes, so stamped values compare correctly against bound parameters
+    return "(strftime('%Y-%m-%d %H:%M:%f', 'now') || '000')"
+
+@compiles(utcnow, 'postgresql')
+def _utcnow_postgresql(element, compiler, **kw):
+    return "TIMEZONE('utc', CURRENT_TIMESTAMP)"
+
+@compiles(utcnow, 'mysql')
+def _utcnow_mysql(element, compiler, **kw):
+    return "UTC_TIMESTAMP()"
+
 # Association table for download tags
 download_tags = Table(
     'download_tags',
     Base.metadata,
     Column('download_id', Integer, ForeignKey('downloads.id', ondelete='CASCADE'), primary_key=True),
     Column('tag_id', Integer, ForeignKey('tags.id', ondelete='CASCADE'), primary_key=True),
-    Index('idx_download_tags_download_id', 'download_id'),
-    Index('idx_download_tags_tag_id', 'tag_id')
+    # The (download_id, tag_id) primary key already serves download -> tags lookups;
+    # this covers the reverse tag -> downloads direction.
+    Index('idx_download_tags_tag_download', 'tag_id', 'download_id')
 )
 
 class Download(Base):
@@ -29,22 +55,35 @@ class Download(Base):
     eta = Column(String(50), nullable=True)
     error_message = Column(Text, nullable=True)
     file_size = Column(Integer, nullable=True)  # bytes
+    queue_position = Column(Integer, nullable=True, index=True)
     
     # Timestamps
     queued_at = Column(DateTime, nullable=True)
     started_at = Column(DateTime, nullable=True)
     completed_at = Column(DateTime, nullable=True)
-    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
-    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Stamped by the database so every worker shares one clock
+    created_at = Column(DateTime, nullable=False, default=utcnow(), server_default=utcnow())
+    updated_at = Column(
+        DateTime, nullable=False, default=utcnow(), server_default=utcnow(), onupdate=utcnow()
+    )
     
     # Relationships
     tags = relationship('Tag', secondary=download_tags, back_populates='downloads')
     
     __table_args__ = (
         Index('idx_downloads_status_type', 'status', 'download_type'),
-        Index('idx_downloads_created_at', 'created_at'),
+        Index('idx_downloads_created_at_id', 'created_at', 'id'),
         {'extend_existing': True}
     )
+    # Fetch the server-generated timestamps in the INSERT/UPDATE itself (RETURNING)
+    __mapper_args__ = {'eager_defaults': True}
+
+# Trigram index so substring ILIKE searches on download names can use an index
+# on PostgreSQL; upgrade_db creates it once pg_trgm is available
+DOWNLOAD_NAME_TRGM_INDEX_SQL = (
+    "CREATE INDEX IF NOT EXISTS idx_downloads_name_trgm "
+    "ON downloads USING gin (name gin_trgm_ops)"
+)
 
 class Tag(Base):
     """Tags for categorizing downloads"""
@@ -71,5 +110,6 @@ class Tag(Base):
         {'extend_existing': True}
     )
 
-# Create indexes for foreign keys
-Index('idx_download_tags_composite', download_tags.c.download_id, download_tags.c.tag_id)
+# Names the services import the ORM models under
+DownloadTable = Download
+TagTable = Tag
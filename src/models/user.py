@@ -1,6 +1,6 @@
 from datetime import datetime
 from typing import Optional, List
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Table
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Table, JSON, Text, Index, false, true
 from sqlalchemy.orm import relationship
 from pydantic import BaseModel, EmailStr, constr
 from ..database import Base
@@ -33,6 +33,13 @@ class User(Base):
     api_keys = relationship('APIKey', back_populates='user', cascade='all, delete-orphan')
     audit_logs = relationship('AuditLog', back_populates='user')
 
+# Trigram index over the combined search text so list_users substring searches
+# can use an index on PostgreSQL; upgrade_db creates it once pg_trgm is available
+USER_SEARCH_TRGM_INDEX_SQL = (
+    "CREATE INDEX IF NOT EXISTS idx_users_search_trgm ON users USING gin "
+    "((username || ' ' || coalesce(email, '') || ' ' || coalesce(full_name, '')) gin_trgm_ops)"
+)
+
 class Role(Base):
     """Role database model"""
     __tablename__ = 'roles'
@@ -40,7 +47,7 @@ class Role(Base):
     id = Column(Integer, primary_key=True)
     name = Column(String(50), unique=True, nullable=False)
     description = Column(String(200))
-    permissions = Column(String(500))  # JSON string of permissions
+    permissions = Column(JSON, default=list)  # List of permission names
     created_at = Column(DateTime, default=datetime.utcnow)
 
     # Relationships
@@ -51,7 +58,8 @@ class APIKey(Base):
     __tablename__ = 'api_keys'
 
     id = Column(Integer, primary_key=True)
-    key = Column(String(64), unique=True, nullable=False, index=True)
+    key_prefix = Column(String(8), nullable=False, index=True)  # First characters of the raw key
+    key_hash = Column(String(64), unique=True, nullable=False)  # SHA-256 hex digest of the raw key
     name = Column(String(100), nullable=False)
     user_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'))
     scopes = Column(String(200))  # JSON string of scopes
@@ -74,11 +82,25 @@ class AuditLog(Base):
     details = Column(String(500))  # JSON string of details
     ip_address = Column(String(45))  # IPv6-compatible
     user_agent = Column(String(200))
+    success = Column(Boolean, nullable=False, default=True, server_default=true())
+    error = Column(Text, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
 
     # Relationships
     user = relationship('User', back_populates='audit_logs')
 
+    __table_args__ = (
+        # Failures are rare, so a partial index on them stays tiny
+        Index(
+            'idx_audit_success', 'success',
+            postgresql_where=(success == false()),
+            sqlite_where=(success == false())
+        ),
+        Index('idx_audit_created_success', 'created_at', 'success'),
+        # Serves per-user audit pages newest first, including the id tiebreak
+        Index('idx_audit_user_created', user_id, created_at.desc(), id.desc()),
+    )
+
 # Pydantic models for API
 class UserBase(BaseModel):
     """Base user schema"""
@@ -147,7 +169,7 @@ class APIKeyCreate(APIKeyBase):
 class APIKeyInDB(APIKeyBase):
     """API key database schema"""
     id: int
-    key: str
+    key_prefix: str
     user_id: int
     last_used: Optional[datetime] = None
     created_at: datetime
@@ -155,6 +177,10 @@ class APIKeyInDB(APIKeyBase):
     class Config:
         from_attributes = True
 
+class APIKeyCreated(APIKeyInDB):
+    """Newly created API key, the only response that includes the raw key"""
+    key: str
+
 class AuditLogCreate(BaseModel):
     """Audit log creation schema"""
     action: str
@@ -174,6 +200,8 @@ class AuditLogInDB(BaseModel):
     details: Optional[dict]
     ip_address: Optional[str]
     user_agent: Optional[str]
+    success: bool = True
+    error: Optional[str] = None
     created_at: datetime
 
     class Config:
@@ -1,14 +1,95 @@
+import hashlib
+import weakref
+import orjson
+from fastapi import FastAPI, Request, Response
 from fastapi.openapi.utils import get_openapi
 from .config import settings
 
-def custom_openapi(app):
-    """Generate custom OpenAPI schema"""
-    if app.openapi_schema:
-        return app.openapi_schema
+# Custom tags metadata
+_TAGS_META = [
+    {
+        "name": "downloads",
+        "description": "Download management operations"
+    },
+    {
+        "name": "queue",
+        "description": "Queue management operations"
+    },
+    {
+        "name": "tags",
+        "description": "Tag management operations"
+    },
+    {
+        "name": "system",
+        "description": "System information and settings"
+    },
+    {
+        "name": "websocket",
+        "description": "Real-time WebSocket communication"
+    }
+]
 
+# Security schemes
+_SECURITY_SCHEMES = {
+    "bearerAuth": {
+        "type": "http",
+        "scheme": "bearer",
+        "bearerFormat": "JWT"
+    }
+}
+
+# Response examples
+_EXAMPLES = {
+    "Download": {
+        "value": {
+            "id": 1,
+            "name": "Example Download",
+            "status": "downloading",
+            "progress": 45.5,
+            "download_type": "torrent",
+            "download_path": "/downloads/example",
+            "speed": 1024000,
+            "eta": "00:15:30",
+            "tags": [
+                {
+                    "id": 1,
+                    "name": "movies",
+                    "color": "#ff0000"
+                }
+            ]
+        }
+    },
+    "Tag": {
+        "value": {
+            "id": 1,
+            "name": "movies",
+            "color": "#ff0000",
+            "tag_type": "custom",
+            "destination_folder": "/media/movies",
+            "auto_assign_pattern": ".*\\.mp4$"
+        }
+    },
+    "QueueStats": {
+        "value": {
+            "total_items": 10,
+            "active_downloads": 2,
+            "queued_downloads": 5,
+            "completed_downloads": 2,
+            "failed_downloads": 1,
+            "total_progress": 35.5,
+            "average_speed": 1024000
+        }
+    }
+}
+
+# app -> (route identities, version, serialized schema) of the last schema built
+_schema_cache: "weakref.WeakKeyDictionary[FastAPI, tuple]" = weakref.WeakKeyDictionary()
+
+def _build_schema(routes: list, version: str) -> dict:
+    """Build the OpenAPI schema for a set of routes"""
     openapi_schema = get_openapi(
         title=settings.APP_NAME,
-        version=settings.APP_VERSION,
+        version=version,
         description="""
         Media Download Manager API - A unified solution for managing media downloads.
         
@@ -44,89 +125,63 @@ def custom_openapi(app):
         }
         ```
         """,
-        routes=app.routes,
+        routes=routes,
     )
 
-    # Custom tags metadata
-    openapi_schema["tags"] = [
-        {
-            "name": "downloads",
-            "description": "Download management operations"
-        },
-        {
-            "name": "queue",
-            "description": "Queue management operations"
-        },
-        {
-            "name": "tags",
-            "description": "Tag management operations"
-        },
-        {
-            "name": "system",
-            "description": "System information and settings"
-        },
-        {
-            "name": "websocket",
-            "description": "Real-time WebSocket communication"
-        }
-    ]
-
-    # Security schemes
-    openapi_schema["components"]["securitySchemes"] = {
-        "bearerAuth": {
-            "type": "http",
-            "scheme": "bearer",
-            "bearerFormat": "JWT"
-        }
-    }
+    openapi_schema["tags"] = _TAGS_META
+    openapi_schema["components"]["securitySchemes"] = _SECURITY_SCHEMES
+    openapi_schema["components"]["examples"] = _EXAMPLES
 
     # Add security requirement to all routes
     if "security" not in openapi_schema:
         openapi_schema["security"] = [{"bearerAuth": []}]
 
-    # Add response examples
-    openapi_schema["components"]["examples"] = {
-        "Download": {
-            "value": {
-                "id": 1,
-                "name": "Example Download",
-                "status": "downloading",
-                "progress": 45.5,
-                "download_type": "torrent",
-                "download_path": "/downloads/example",
-                "speed": 1024000,
-                "eta": "00:15:30",
-                "tags": [
-                    {
-                        "id": 1,
-                        "name": "movies",
-                        "color": "#ff0000"
-                    }
-                ]
-            }
-        },
-        "Tag": {
-            "value": {
-                "id": 1,
-                "name": "movies",
-                "color": "#ff0000",
-                "tag_type": "custom",
-                "destination_folder": "/media/movies",
-                "auto_assign_pattern": ".*\\.mp4$"
-            }
-        },
-        "QueueStats": {
-            "value": {
-                "total_items": 10,
-                "active_downloads": 2,
-                "queued_downloads": 5,
-                "completed_downloads": 2,
-                "failed_downloads": 1,
-                "total_progress": 35.5,
-                "average_speed": 1024000
-            }
-        }
-    }
+    return openapi_schema
+
+def custom_openapi(app):
+    """Generate custom OpenAPI schema"""
+    if app.openapi_schema:
+        return app.openapi_schema
 
-    app.openapi_schema = openapi_schema
+    app.openapi_schema = _cached_schema(app)
     return app.openapi_schema
+
+def _cached_schema(app) -> dict:
+    """Get a fresh copy of the app's schema, rebuilding it only when its routes change"""
+    # Routes are not hashable, so the live route objects are keyed by identity
+    route_ids = tuple(map(id, app.routes))
+    cached = _schema_cache.get(app)
+    if cached and cached[0] == route_ids and cached[1] == settings.APP_VERSION:
+        return orjson.loads(cached[2])
+
+    schema = _build_schema(app.routes, settings.APP_VERSION)
+    _schema_cache[app] = (route_ids, settings.APP_VERSION, orjson.dumps(schema))
+    return schema
+
+def get_openapi_json(app) -> tuple[bytes, str]:
+    """Get the serialized OpenAPI schema and its ETag, built once per app"""
+    if getattr(app.state, "openapi_json", None) is None:
+        content = orjson.dumps(custom_openapi(app))
+        app.state.openapi_etag = f'"{hashlib.sha256(content).hexdigest()}"'
+        app.state.openapi_json = content
+    return app.state.openapi_json, app.state.openapi_etag
+
+def setup_openapi(app: FastAPI) -> None:
+    """Serve the custom OpenAPI schema from pre-serialized bytes"""
+    app.openapi = lambda: custom_openapi(app)
+    if not app.openapi_url:
+        return
+
+    # Replace FastAPI's default schema route, which re-encodes on every hit
+    app.router.routes = [
+        route for route in app.router.routes
+        if getattr(route, "path", None) != app.openapi_url
+    ]
+
+    @app.get(app.openapi_url, include_in_schema=False)
+    async def openapi_json(request: Request) -> Response:
+        content, etag = get_openapi_json(app)
+        headers = {"ETag": etag}
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers=headers)
+        return Response(content=content, media_type="application/json", headers=headers)
@@ -1,16 +1,23 @@
+import asyncio
+import base64
+import binascii
 import logging
-from typing import List, Optional
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, Query, Path
-from sqlalchemy.orm import Session
+from typing import List, Optional, Tuple
+from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, Query, Path, Response
+from pydantic import TypeAdapter
+from sqlalchemy import func, insert, delete, tuple_
+from sqlalchemy.orm import Session, selectinload, load_only
 from sqlalchemy.exc import SQLAlchemyError
 from ..database import get_db
-from ..models.tables import Download, Tag
+from ..models.tables import Download, Tag, download_tags
 from ..models.schemas import (
     DownloadCreate, DownloadUpdate, Download as DownloadSchema,
-    DownloadProgress, DownloadFilter, DownloadSort
+    DownloadProgress, DownloadFilter, DownloadSort, Tag as TagSchema
 )
 from ..models.enums import DownloadStatus, DownloadType
+from ..services.download_service import DownloadService
 from ..services_manager import services
+from .queue import invalidate_queue_stats
 from ..config import settings
 from datetime import datetime
 import os
@@ -18,19 +25,111 @@ import os
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/downloads", tags=["downloads"])
 
+UPLOAD_CHUNK_SIZE = 64 * 1024  # bytes
+
+def _schema_columns(model, schema) -> tuple:
+    """Get the mapped columns of a model that a response schema exposes"""
+    columns = model.__table__.columns
+    return tuple(getattr(model, name) for name in schema.model_fields if name in columns)
+
+# Columns needed to serialize list responses; anything else stays in the database
+_DOWNLOAD_COLUMNS = _schema_columns(Download, DownloadSchema)
+_TAG_COLUMNS = _schema_columns(Tag, TagSchema)
+
+# Validates and serializes a whole page of downloads in one call
+_DOWNLOAD_LIST_ADAPTER = TypeAdapter(List[DownloadSchema])
+
+# Columns list_downloads may be sorted by
+_SORTABLE = {
+    "name": Download.name,
+    "status": Download.status,
+    "progress": Download.progress,
+    "created_at": Download.created_at,
+    "updated_at": Download.updated_at,
+}
+
+# Download directories already created by this process
+_ensured_dirs: set = set()
+
+async def _ensure_download_path(path: str) -> None:
+    """Create a download directory once, without blocking the event loop"""
+    if path in _ensured_dirs:
+        return
+    await asyncio.to_thread(os.makedirs, path, exist_ok=True)
+    _ensured_dirs.add(path)
+
+async def _read_nzb_upload(file: UploadFile, max_bytes: int) -> bytes:
+    """Read an NZB upload in chunks, rejecting it as soon as it exceeds max_bytes"""
+    content = bytearray()
+    while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+        content += chunk
+        if len(content) > max_bytes:
+            raise HTTPException(
+                status_code=413,
+                detail=f"File too large. Maximum size for NZB files is {settings.MAX_NZB_FILE_SIZE_MB}MB."
+            )
+    return bytes(content)
+
+async def get_download_svc() -> DownloadService:
+    """Resolve the download service singleton created at startup"""
+    download_service = services.get_download_service()
+    if download_service is None:
+        raise HTTPException(status_code=503, detail="Download service unavailable")
+    return download_service
+
+def _validate_tag_ids(db: Session, tag_ids: List[int]) -> None:
+    """Ensure every tag ID exists without loading the Tag rows"""
+    count = db.query(func.count(Tag.id)).filter(Tag.id.in_(tag_ids)).scalar()
+    if count != len(set(tag_ids)):
+        raise HTTPException(status_code=400, detail="One or more invalid tag IDs")
+
+def _attach_tags(db: Session, download_id: int, tag_ids: List[int]) -> None:
+    """Insert download/tag associations in a single statement"""
+    db.execute(
+        insert(download_tags),
+        [{"download_id": download_id, "tag_id": tag_id} for tag_id in set(tag_ids)]
+    )
+
+def _encode_cursor(download: Download) -> str:
+    """Encode the keyset position of a download as an opaque cursor"""
+    raw = f"{download.created_at.isoformat()}|{download.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def _decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Decode a cursor produced by _encode_cursor"""
+    try:
+        created_at, download_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), int(download_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
 @router.get("/", response_model=List[DownloadSchema])
 async def list_downloads(
     db: Session = Depends(get_db),
     filter: Optional[DownloadFilter] = None,
     sort: Optional[DownloadSort] = None,
     offset: int = Query(0, ge=0),
-    limit: int = Query(50, ge=1, le=100)
+    limit: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = Query(None)
 ):
     """
     List downloads with filtering, sorting and pagination
+
+    Pages in the default order can be fetched with keyset pagination by
+    passing the X-Next-Cursor header of the previous page as ``cursor``.
     """
     try:
-        query = db.query(Download)
+        if cursor and sort:
+            raise HTTPException(
+                status_code=400,
+                detail="Cursor pagination is only supported with the default sort order"
+            )
+
+        # Load tags for the whole page in one extra SELECT instead of one per row
+        query = db.query(Download).options(
+            load_only(*_DOWNLOAD_COLUMNS),
+            selectinload(Download.tags).load_only(*_TAG_COLUMNS)
+        )
 
         # Apply filters
         if filter:
@@ -41,6 +140,7 @@ async def list_downloads(
             if filter.tag_ids:
                 query = query.filter(Download.tags.any(Tag.id.in_(filter.tag_ids)))
             if filter.search:
+                # Served by idx_downloads_name_trgm on PostgreSQL
                 query = query.filter(Download.name.ilike(f"%{filter.search}%"))
             if filter.date_from:
                 query = query.filter(Download.created_at >= filter.date_from)
@@ -49,17 +149,33 @@ async def list_downloads(
 
         # Apply sorting
         if sort:
-            if sort.direction == "desc":
-                query = query.order_by(getattr(Download, sort.field).desc())
-            else:
-                query = query.order_by(getattr(Download, sort.field))
+            column = _SORTABLE.get(sort.field)
+            if column is None:
+                raise HTTPException(status_code=400, detail="Invalid sort field")
+            query = query.order_by(column.desc() if sort.direction == "desc" else column.asc())
         else:
-            query = query.order_by(Download.created_at.desc())
-
-        # Apply pagination
-        downloads = query.offset(offset).limit(limit).all()
-        return downloads
+            query = query.order_by(Download.created_at.desc(), Download.id.desc())
+
+        # Apply pagination, seeking past the cursor instead of scanning the offset
+        if cursor:
+            created_at, download_id = _decode_cursor(cursor)
+            query = query.filter(
+                tuple_(Download.created_at, Download.id) < tuple_(created_at, download_id)
+            )
+        else:
+            query = query.offset(offset)
+        downloads = query.limit(limit).all()
+
+        headers = {}
+        if not sort and len(downloads) == limit:
+            headers["X-Next-Cursor"] = _encode_cursor(downloads[-1])
+        body = _DOWNLOAD_LIST_ADAPTER.dump_json(
+            _DOWNLOAD_LIST_ADAPTER.validate_python(downloads, from_attributes=True)
+        )
+        return Response(content=body, media_type="application/json", headers=headers)
 
+    except HTTPException:
+        raise
     except SQLAlchemyError as e:
         logger.error(f"Database error in list_downloads: {e}")
         raise HTTPException(status_code=500, detail="Database error occurred")
@@ -72,6 +188,7 @@ async def upload_nzb(
     file: UploadFile = File(...),
     path: Optional[str] = Query(None),
     tag_ids: List[int] = Query([]),
+    download_service: DownloadService = Depends(get_download_svc),
     db: Session = Depends(get_db)
 ):
     """
@@ -83,34 +200,28 @@ async def upload_nzb(
             raise HTTPException(status_code=400, detail="Invalid file type. Must be .nzb")
 
         # Read file content
-        content = await file.read()
+        content = await _read_nzb_upload(file, settings.MAX_NZB_FILE_SIZE_MB * 1024 * 1024)
         if not content:
             raise HTTPException(status_code=400, detail="Empty file")
 
-        # Get download service
-        download_service = services.get_download_service()
-        if not download_service:
-            raise HTTPException(status_code=503, detail="Download service unavailable")
-
         # Use specified path or default
         download_path = path or settings.DOWNLOAD_PATH
-        os.makedirs(download_path, exist_ok=True)
+        await _ensure_download_path(download_path)
 
         # Create download
         download = await download_service.add_nzb(
-            nzb_content=content.decode(),
+            nzb_content=content,
             download_path=download_path,
             filename=file.filename
         )
 
         # Add tags if specified
         if tag_ids:
-            tags = db.query(Tag).filter(Tag.id.in_(tag_ids)).all()
-            if len(tags) != len(tag_ids):
-                raise HTTPException(status_code=400, detail="One or more invalid tag IDs")
-            download.tags.extend(tags)
+            _validate_tag_ids(db, tag_ids)
+            _attach_tags(db, download.id, tag_ids)
             db.commit()
 
+        invalidate_queue_stats()
         return download
 
     except HTTPException:
@@ -124,6 +235,7 @@ async def add_magnet(
     magnet_link: str = Query(..., min_length=20),
     path: Optional[str] = Query(None),
     tag_ids: List[int] = Query([]),
+    download_service: DownloadService = Depends(get_download_svc),
     db: Session = Depends(get_db)
 ):
     """
@@ -133,12 +245,8 @@ async def add_magnet(
         if not settings.ENABLE_TORRENTS:
             raise HTTPException(status_code=403, detail="Torrent downloads are disabled")
 
-        download_service = services.get_download_service()
-        if not download_service:
-            raise HTTPException(status_code=503, detail="Download service unavailable")
-
         download_path = path or settings.DOWNLOAD_PATH
-        os.makedirs(download_path, exist_ok=True)
+        await _ensure_download_path(download_path)
 
         download = await download_service.add_magnet_download(
             magnet_link=magnet_link,
@@ -146,12 +254,11 @@ async def add_magnet(
         )
 
         if tag_ids:
-            tags = db.query(Tag).filter(Tag.id.in_(tag_ids)).all()
-            if len(tags) != len(tag_ids):
-                raise HTTPException(status_code=400, detail="One or more invalid tag IDs")
-            download.tags.extend(tags)
+            _validate_tag_ids(db, tag_ids)
+            _attach_tags(db, download.id, tag_ids)
             db.commit()
 
+        invalidate_queue_stats()
         return download
 
     except HTTPException:
@@ -163,21 +270,19 @@ async def add_magnet(
 @router.post("/{download_id}/pause", response_model=DownloadSchema)
 async def pause_download(
     download_id: int = Path(..., ge=1),
+    download_service: DownloadService = Depends(get_download_svc),
     db: Session = Depends(get_db)
 ):
     """
     Pause a download
     """
     try:
-        download_service = services.get_download_service()
-        if not download_service:
-            raise HTTPException(status_code=503, detail="Download service unavailable")
-
-        success = await download_service.pause_download(download_id)
-        if not success:
+        download = await download_service.pause_download(download_id)
+        if not download:
             raise HTTPException(status_code=404, detail="Download not found")
+        invalidate_queue_stats()
 
-        return await download_service.get_download(download_id)
+        return download
 
     except HTTPException:
         raise
@@ -188,21 +293,19 @@ async def pause_download(
 @router.post("/{download_id}/resume", response_model=DownloadSchema)
 async def resume_download(
     download_id: int = Path(..., ge=1),
+    download_service: DownloadService = Depends(get_download_svc),
     db: Session = Depends(get_db)
 ):
     """
     Resume a paused download
     """
     try:
-        download_service = services.get_download_service()
-        if not download_service:
-            raise HTTPException(status_code=503, detail="Download service unavailable")
-
-        success = await download_service.resume_download(download_id)
-        if not success:
+        download = await download_service.resume_download(download_id)
+        if not download:
             raise HTTPException(status_code=404, detail="Download not found")
+        invalidate_queue_stats()
 
-        return await download_service.get_download(download_id)
+        return download
 
     except HTTPException:
         raise
@@ -214,19 +317,17 @@ async def resume_download(
 async def delete_download(
     download_id: int = Path(..., ge=1),
     delete_files: bool = Query(False),
+    download_service: DownloadService = Depends(get_download_svc),
     db: Session = Depends(get_db)
 ):
     """
     Delete a download and optionally its files
     """
     try:
-        download_service = services.get_download_service()
-        if not download_service:
-            raise HTTPException(status_code=503, detail="Download service unavailable")
-
         success = await download_service.remove_download(download_id, delete_files)
         if not success:
             raise HTTPException(status_code=404, detail="Download not found")
+        invalidate_queue_stats()
 
         return {"message": "Download deleted successfully"}
 
@@ -240,26 +341,24 @@ async def delete_download(
 async def update_download(
     download_id: int = Path(..., ge=1),
     update: DownloadUpdate = None,
+    download_service: DownloadService = Depends(get_download_svc),
     db: Session = Depends(get_db)
 ):
     """
     Update download information
     """
     try:
-        download_service = services.get_download_service()
-        if not download_service:
-            raise HTTPException(status_code=503, detail="Download service unavailable")
-
         download = await download_service.get_download(download_id)
         if not download:
             raise HTTPException(status_code=404, detail="Download not found")
 
         # Update tags if specified
         if update.tag_ids is not None:
-            tags = db.query(Tag).filter(Tag.id.in_(update.tag_ids)).all()
-            if len(tags) != len(update.tag_ids):
-                raise HTTPException(status_code=400, detail="One or more invalid tag IDs")
-            download.tags = tags
+            _validate_tag_ids(db, update.tag_ids)
+            db.execute(delete(download_tags).where(download_tags.c.download_id == download_id))
+            if update.tag_ids:
+                _attach_tags(db, download_id, update.tag_ids)
+            db.commit()
 
         # Update other fields
         for field, value in update.dict(exclude_unset=True).items():
@@ -278,16 +377,13 @@ async def update_download(
 @router.get("/{download_id}/progress", response_model=DownloadProgress)
 async def get_download_progress(
     download_id: int = Path(..., ge=1),
+    download_service: DownloadService = Depends(get_download_svc),
     db: Session = Depends(get_db)
 ):
     """
     Get current download progress
     """
     try:
-        download_service = services.get_download_service()
-        if not download_service:
-            raise HTTPException(status_code=503, detail="Download service unavailable")
-
         progress = await download_service.get_progress(download_id)
         if not progress:
             raise HTTPException(status_code=404, detail="Download not found")
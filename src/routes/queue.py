@@ -1,6 +1,9 @@
 import logging
-from typing import List, Optional
+import time
+from typing import List, Optional, Tuple
 from fastapi import APIRouter, HTTPException, Depends, Path, Query
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
 from ..database import get_db
@@ -13,6 +16,16 @@ from pydantic import BaseModel
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/queue", tags=["queue"])
 
+QUEUE_STATS_TTL = 1.0  # seconds
+
+# (monotonic timestamp, stats) of the last computed queue statistics
+_stats_cache: Optional[Tuple[float, "QueueStats"]] = None
+
+def invalidate_queue_stats() -> None:
+    """Drop cached queue statistics after the queue changes"""
+    global _stats_cache
+    _stats_cache = None
+
 class QueueItem(BaseModel):
     """Queue item with position information"""
     download_id: int
@@ -28,7 +41,7 @@ class QueueStats(BaseModel):
     total_progress: float
     average_speed: float
 
-@router.get("/", response_model=List[DownloadSchema])
+@router.get("/", response_model=List[DownloadSchema], response_class=ORJSONResponse)
 async def get_queue(
     status: Optional[List[DownloadStatus]] = Query(None),
     db: Session = Depends(get_db)
@@ -59,22 +72,25 @@ async def reorder_queue(
     Reorder items in the download queue
     """
     try:
-        queue_service = services.get_queue_manager()
-        if not queue_service:
-            raise HTTPException(status_code=503, detail="Queue service unavailable")
-
         # Validate all download IDs exist
         download_ids = [item.download_id for item in items]
-        downloads = db.query(Download).filter(Download.id.in_(download_ids)).all()
-        if len(downloads) != len(items):
+        count = db.query(func.count(Download.id)).filter(Download.id.in_(download_ids)).scalar()
+        if count != len(items):
             raise HTTPException(status_code=400, detail="One or more invalid download IDs")
 
-        # Update queue order
-        return await queue_service.reorder_queue(items)
+        # Update queue order in a single batched statement
+        db.bulk_update_mappings(Download, [
+            {"id": item.download_id, "queue_position": item.position}
+            for item in items
+        ])
+        db.commit()
+        invalidate_queue_stats()
+        return sorted(items, key=lambda item: item.position)
 
     except HTTPException:
         raise
     except Exception as e:
+        db.rollback()
         logger.error(f"Error reordering queue: {e}")
         raise HTTPException(status_code=500, detail="Failed to reorder queue")
 
@@ -92,6 +108,7 @@ async def clear_queue(
             raise HTTPException(status_code=503, detail="Queue service unavailable")
 
         cleared_count = await queue_service.clear_queue(status)
+        invalidate_queue_stats()
         return {
             "message": "Queue cleared successfully",
             "cleared_items": cleared_count
@@ -106,12 +123,36 @@ async def get_queue_stats(db: Session = Depends(get_db)):
     """
     Get queue statistics
     """
+    global _stats_cache
     try:
-        queue_service = services.get_queue_manager()
-        if not queue_service:
-            raise HTTPException(status_code=503, detail="Queue service unavailable")
-
-        return await queue_service.get_stats()
+        # Dashboards poll this endpoint; serve recent stats from memory
+        cached = _stats_cache
+        if cached and time.monotonic() - cached[0] < QUEUE_STATS_TTL:
+            return cached[1]
+
+        # Aggregate everything in one statement instead of loading every row
+        downloading = Download.status == DownloadStatus.DOWNLOADING
+        row = db.query(
+            func.count(Download.id).label("total_items"),
+            func.count(Download.id).filter(downloading).label("active_downloads"),
+            func.count(Download.id).filter(
+                Download.status == DownloadStatus.QUEUED
+            ).label("queued_downloads"),
+            func.count(Download.id).filter(
+                Download.status == DownloadStatus.COMPLETED
+            ).label("completed_downloads"),
+            func.count(Download.id).filter(
+                Download.status == DownloadStatus.FAILED
+            ).label("failed_downloads"),
+            func.coalesce(func.avg(Download.progress), 0.0).label("total_progress"),
+            func.coalesce(
+                func.avg(Download.speed).filter(downloading), 0.0
+            ).label("average_speed")
+        ).one()
+
+        stats = QueueStats(**row._mapping)
+        _stats_cache = (time.monotonic(), stats)
+        return stats
 
     except Exception as e:
         logger.error(f"Error getting queue stats: {e}")
@@ -131,7 +172,7 @@ async def move_in_queue(
         if not queue_service:
             raise HTTPException(status_code=503, detail="Queue service unavailable")
 
-        download = db.query(Download).get(download_id)
+        download = db.get(Download, download_id)
         if not download:
             raise HTTPException(status_code=404, detail="Download not found")
 
@@ -156,7 +197,7 @@ async def prioritize_download(
         if not queue_service:
             raise HTTPException(status_code=503, detail="Queue service unavailable")
 
-        download = db.query(Download).get(download_id)
+        download = db.get(Download, download_id)
         if not download:
             raise HTTPException(status_code=404, detail="Download not found")
 
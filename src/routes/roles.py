@@ -1,29 +1,56 @@
+import hashlib
 import logging
+from dataclasses import dataclass
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, Query, Path, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, Path, Request, Response
+from pydantic import TypeAdapter
+from sqlalchemy import exists
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 from ..database import get_db
 from ..models.user import (
-    Role, User, RoleCreate, RoleUpdate, RoleInDB, UserInDB
+    Role, User, RoleCreate, RoleUpdate, RoleInDB, UserInDB, user_roles
 )
 from ..auth import require_admin
-from ..services.audit import create_audit_log
-import json
+from ..services.audit import enqueue_audit_log
+from .users import _invalidate_user_cache
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/roles", tags=["roles"])
 
+_ROLE_LIST_ADAPTER = TypeAdapter(List[RoleInDB])
+
+@dataclass
+class AdminCtx:
+    """Authenticated admin and database session for a role request"""
+    user: User
+    db: Session
+
+async def admin_ctx(
+    user: User = Depends(require_admin),
+    db: Session = Depends(get_db)
+) -> AdminCtx:
+    """Resolve the admin user and session as a single route dependency"""
+    return AdminCtx(user=user, db=db)
+
+def _json_with_etag(request: Request, body: bytes) -> Response:
+    """Send a JSON body tagged with its hash, or a 304 if the client already has it"""
+    etag = f'"{hashlib.sha256(body).hexdigest()}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
 @router.get("/", response_model=List[RoleInDB])
-async def list_roles(
+def list_roles(
+    request: Request,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
     search: Optional[str] = None,
-    _: User = Depends(require_admin),
-    db: Session = Depends(get_db)
+    ctx: AdminCtx = Depends(admin_ctx)
 ):
     """List roles with filtering and pagination"""
-    query = db.query(Role)
+    query = ctx.db.query(Role)
     
     if search:
         query = query.filter(
@@ -31,30 +58,32 @@ async def list_roles(
             (Role.description.ilike(f"%{search}%"))
         )
     
-    return query.offset(skip).limit(limit).all()
+    roles = query.offset(skip).limit(limit).all()
+    body = _ROLE_LIST_ADAPTER.dump_json(
+        _ROLE_LIST_ADAPTER.validate_python(roles, from_attributes=True)
+    )
+    return _json_with_etag(request, body)
 
 @router.post("/", response_model=RoleInDB)
-async def create_role(
+def create_role(
     role_create: RoleCreate,
     request: Request,
-    current_user: User = Depends(require_admin),
-    db: Session = Depends(get_db)
+    ctx: AdminCtx = Depends(admin_ctx)
 ):
     """Create a new role"""
     try:
         db_role = Role(
             name=role_create.name,
             description=role_create.description,
-            permissions=json.dumps(role_create.permissions)
+            permissions=role_create.permissions
         )
-        db.add(db_role)
-        db.commit()
-        db.refresh(db_role)
+        ctx.db.add(db_role)
+        ctx.db.commit()
+        ctx.db.refresh(db_role)
         
         # Audit log
-        await create_audit_log(
-            db=db,
-            user_id=current_user.id,
+        enqueue_audit_log(
+            user_id=ctx.user.id,
             action="CREATE",
             resource_type="ROLE",
             resource_id=db_role.id,
@@ -63,54 +92,52 @@ async def create_role(
         
         return db_role
     except IntegrityError:
-        db.rollback()
+        ctx.db.rollback()
         raise HTTPException(status_code=400, detail="Role name already exists")
     except Exception as e:
-        db.rollback()
-        logger.error(f"Error creating role: {e}")
+        ctx.db.rollback()
+        logger.error("Error creating role: %s", e)
         raise HTTPException(status_code=500, detail="Failed to create role")
 
 @router.get("/{role_id}", response_model=RoleInDB)
-async def get_role(
+def get_role(
+    request: Request,
     role_id: int = Path(..., ge=1),
-    _: User = Depends(require_admin),
-    db: Session = Depends(get_db)
+    ctx: AdminCtx = Depends(admin_ctx)
 ):
     """Get role by ID"""
-    role = db.query(Role).get(role_id)
+    role = ctx.db.get(Role, role_id)
     if not role:
         raise HTTPException(status_code=404, detail="Role not found")
-    return role
+    return _json_with_etag(request, RoleInDB.model_validate(role).model_dump_json().encode())
 
 @router.put("/{role_id}", response_model=RoleInDB)
-async def update_role(
+def update_role(
     role_update: RoleUpdate,
     role_id: int = Path(..., ge=1),
     request: Request,
-    current_user: User = Depends(require_admin),
-    db: Session = Depends(get_db)
+    ctx: AdminCtx = Depends(admin_ctx)
 ):
     """Update a role"""
-    role = db.query(Role).get(role_id)
+    role = ctx.db.get(Role, role_id)
     if not role:
         raise HTTPException(status_code=404, detail="Role not found")
     
     try:
         # Update role fields
         update_data = role_update.dict(exclude_unset=True)
-        if "permissions" in update_data:
-            update_data["permissions"] = json.dumps(update_data["permissions"])
         
         for field, value in update_data.items():
             setattr(role, field, value)
         
-        db.commit()
-        db.refresh(role)
+        ctx.db.commit()
+        ctx.db.refresh(role)
+        # Cached user bodies embed their roles
+        _invalidate_user_cache()
         
         # Audit log
-        await create_audit_log(
-            db=db,
-            user_id=current_user.id,
+        enqueue_audit_log(
+            user_id=ctx.user.id,
             action="UPDATE",
             resource_type="ROLE",
             resource_id=role_id,
@@ -120,78 +147,82 @@ async def update_role(
         
         return role
     except IntegrityError:
-        db.rollback()
+        ctx.db.rollback()
         raise HTTPException(status_code=400, detail="Role name already exists")
     except Exception as e:
-        db.rollback()
-        logger.error(f"Error updating role: {e}")
+        ctx.db.rollback()
+        logger.error("Error updating role: %s", e)
         raise HTTPException(status_code=500, detail="Failed to update role")
 
-@router.delete("/{role_id}")
-async def delete_role(
+@router.delete("/{role_id}", status_code=204, response_class=Response)
+def delete_role(
     role_id: int = Path(..., ge=1),
     request: Request,
-    current_user: User = Depends(require_admin),
-    db: Session = Depends(get_db)
+    ctx: AdminCtx = Depends(admin_ctx)
 ):
     """Delete a role"""
-    role = db.query(Role).get(role_id)
+    role = ctx.db.get(Role, role_id)
     if not role:
         raise HTTPException(status_code=404, detail="Role not found")
     
     try:
-        # Check if role is in use
-        if role.users:
+        # Check if role is in use without loading its users
+        if ctx.db.query(exists().where(user_roles.c.role_id == role_id)).scalar():
             raise HTTPException(
                 status_code=400,
                 detail="Cannot delete role that is assigned to users"
             )
         
         # Audit log before deletion
-        await create_audit_log(
-            db=db,
-            user_id=current_user.id,
+        enqueue_audit_log(
+            user_id=ctx.user.id,
             action="DELETE",
             resource_type="ROLE",
             resource_id=role_id,
             request=request
         )
         
-        db.delete(role)
-        db.commit()
-        return {"message": "Role deleted successfully"}
+        ctx.db.delete(role)
+        ctx.db.commit()
+        _invalidate_user_cache()
+        return Response(status_code=204)
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
-        logger.error(f"Error deleting role: {e}")
+        ctx.db.rollback()
+        logger.error("Error deleting role: %s", e)
         raise HTTPException(status_code=500, detail="Failed to delete role")
 
 @router.get("/{role_id}/users", response_model=List[UserInDB])
-async def get_role_users(
+def get_role_users(
     role_id: int = Path(..., ge=1),
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
-    _: User = Depends(require_admin),
-    db: Session = Depends(get_db)
+    ctx: AdminCtx = Depends(admin_ctx)
 ):
     """Get users assigned to a role"""
-    role = db.query(Role).get(role_id)
-    if not role:
+    if ctx.db.query(Role.id).filter(Role.id == role_id).scalar() is None:
         raise HTTPException(status_code=404, detail="Role not found")
     
-    return role.users[skip:skip + limit]
+    return (
+        ctx.db.query(User)
+        .join(User.roles)
+        .filter(Role.id == role_id)
+        .order_by(User.id)
+        .offset(skip)
+        .limit(limit)
+        .all()
+    )
 
 @router.post("/{role_id}/clone", response_model=RoleInDB)
-async def clone_role(
+def clone_role(
     role_id: int = Path(..., ge=1),
     name: str = Query(..., min_length=1),
     request: Request,
-    current_user: User = Depends(require_admin),
-    db: Session = Depends(get_db)
+    ctx: AdminCtx = Depends(admin_ctx)
 ):
     """Clone a role with a new name"""
-    source_role = db.query(Role).get(role_id)
+    source_role = ctx.db.get(Role, role_id)
     if not source_role:
         raise HTTPException(status_code=404, detail="Role not found")
     
@@ -200,16 +231,15 @@ async def clone_role(
         new_role = Role(
             name=name,
             description=f"Clone of {source_role.name}",
-            permissions=source_role.permissions
+            permissions=list(source_role.permissions or [])
         )
-        db.add(new_role)
-        db.commit()
-        db.refresh(new_role)
+        ctx.db.add(new_role)
+        ctx.db.commit()
+        ctx.db.refresh(new_role)
         
         # Audit log
-        await create_audit_log(
-            db=db,
-            user_id=current_user.id,
+        enqueue_audit_log(
+            user_id=ctx.user.id,
             action="CLONE",
             resource_type="ROLE",
             resource_id=role_id,
@@ -219,34 +249,33 @@ async def clone_role(
         
         return new_role
     except IntegrityError:
-        db.rollback()
+        ctx.db.rollback()
         raise HTTPException(status_code=400, detail="Role name already exists")
     except Exception as e:
-        db.rollback()
-        logger.error(f"Error cloning role: {e}")
+        ctx.db.rollback()
+        logger.error("Error cloning role: %s", e)
         raise HTTPException(status_code=500, detail="Failed to clone role")
 
 @router.post("/{role_id}/permissions")
-async def update_role_permissions(
+def update_role_permissions(
     permissions: List[str],
     role_id: int = Path(..., ge=1),
     request: Request,
-    current_user: User = Depends(require_admin),
-    db: Session = Depends(get_db)
+    ctx: AdminCtx = Depends(admin_ctx)
 ):
     """Update role permissions"""
-    role = db.query(Role).get(role_id)
+    role = ctx.db.get(Role, role_id)
     if not role:
         raise HTTPException(status_code=404, detail="Role not found")
     
     try:
-        role.permissions = json.dumps(permissions)
-        db.commit()
+        role.permissions = permissions
+        ctx.db.commit()
+        _invalidate_user_cache()
         
         # Audit log
-        await create_audit_log(
-            db=db,
-            user_id=current_user.id,
+        enqueue_audit_log(
+            user_id=ctx.user.id,
             action="UPDATE_PERMISSIONS",
             resource_type="ROLE",
             resource_id=role_id,
@@ -256,6 +285,6 @@ async def update_role_permissions(
         
         return {"message": "Permissions updated successfully"}
     except Exception as e:
-        db.rollback()
-        logger.error(f"Error updating permissions: {e}")
+        ctx.db.rollback()
+        logger.error("Error updating permissions: %s", e)
         raise HTTPException(status_code=500, detail="Failed to update permissions")
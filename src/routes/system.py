@@ -1,17 +1,31 @@
 from fastapi import APIRouter, Depends, HTTPException
 from ..models.tables import DownloadStatus, DownloadTable
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from ..database import get_db
 from ..config import settings
+import asyncio
 import psutil
 import logging
-from typing import Dict, Any
+import time
+from typing import Dict, Any, Optional, Tuple
 from ..services_manager import services
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+SYSTEM_STATUS_TTL = 2.0  # seconds
+SYSTEM_INFO_TTL = 60.0  # seconds
+METRICS_INTERVAL = 2.0  # seconds
+
+# Latest resource metrics, refreshed by metrics_sampler
+_metrics: Optional[Dict[str, float]] = None
+
+# (monotonic timestamp, response) of the last computed status and info payloads
+_status_cache: Optional[Tuple[float, Dict[str, Any]]] = None
+_info_cache: Optional[Tuple[float, Dict[str, Any]]] = None
+
 async def get_usenet_status() -> Dict[str, Any]:
     """Get current Usenet connection status and metrics"""
     try:
@@ -31,7 +45,7 @@ async def get_usenet_status() -> Dict[str, Any]:
             "download_rate": nzb_service.stats.get("download_rate", 0)
         }
     except Exception as e:
-        logger.error(f"Failed to get Usenet status: {e}")
+        logger.error("Failed to get Usenet status: %s", e)
         return {
             "connected": False,
             "max_connections": settings.USENET_MAX_CONNECTIONS,
@@ -39,26 +53,43 @@ async def get_usenet_status() -> Dict[str, Any]:
             "download_rate": 0
         }
 
+def _sample_metrics() -> Dict[str, float]:
+    """Read system resource metrics"""
+    # Non-blocking: CPU usage since the previous call
+    cpu = psutil.cpu_percent(interval=None)
+    memory = psutil.virtual_memory()
+    
+    # Get disk usage for download directory
+    download_path = settings.DOWNLOAD_PATH or "/"
+    disk = psutil.disk_usage(download_path)
+    
+    return {
+        "cpu_usage": cpu,
+        "memory_usage": memory.percent,
+        "memory_available": memory.available / (1024 * 1024),  # MB
+        "disk_usage": disk.percent,
+        "disk_free": disk.free / (1024 * 1024 * 1024)  # GB
+    }
+
+async def metrics_sampler() -> None:
+    """Refresh the cached system metrics in the background until cancelled"""
+    global _metrics
+    psutil.cpu_percent(interval=None)  # Prime the CPU usage delta
+    while True:
+        await asyncio.sleep(METRICS_INTERVAL)
+        try:
+            _metrics = await asyncio.to_thread(_sample_metrics)
+        except Exception as e:
+            logger.error("Failed to sample system metrics: %s", e)
+
 async def get_system_metrics() -> Dict[str, float]:
     """Get system resource metrics"""
     try:
-        # Get CPU usage with a 0.1 second interval
-        cpu = psutil.cpu_percent(interval=0.1)
-        memory = psutil.virtual_memory()
-        
-        # Get disk usage for download directory
-        download_path = settings.DOWNLOAD_PATH or "/"
-        disk = psutil.disk_usage(download_path)
-        
-        return {
-            "cpu_usage": cpu,
-            "memory_usage": memory.percent,
-            "memory_available": memory.available / (1024 * 1024),  # MB
-            "disk_usage": disk.percent,
-            "disk_free": disk.free / (1024 * 1024 * 1024)  # GB
-        }
+        if _metrics is None:
+            return await asyncio.to_thread(_sample_metrics)
+        return dict(_metrics)
     except Exception as e:
-        logger.error(f"Failed to get system metrics: {e}")
+        logger.error("Failed to get system metrics: %s", e)
         return {
             "cpu_usage": 0,
             "memory_usage": 0,
@@ -70,31 +101,39 @@ async def get_system_metrics() -> Dict[str, float]:
 @router.get("/system/status")
 async def get_system_status(db: Session = Depends(get_db)) -> Dict[str, Any]:
     """Get comprehensive system status including downloads and resources"""
+    global _status_cache
     try:
-        # Get download counts with error handling
+        # Dashboards poll this endpoint; serve a recent snapshot from memory
+        cached = _status_cache
+        if cached and time.monotonic() - cached[0] < SYSTEM_STATUS_TTL:
+            return cached[1]
+
+        # Get download counts per status in one grouped query
+        counts = {status: 0 for status in DownloadStatus}
         try:
-            downloads = db.query(DownloadTable).all()
-            active = sum(1 for d in downloads if d.status == DownloadStatus.DOWNLOADING)
-            queued = sum(1 for d in downloads if d.status == DownloadStatus.QUEUED)
-            completed = sum(1 for d in downloads if d.status == DownloadStatus.COMPLETED)
-            failed = sum(1 for d in downloads if d.status == DownloadStatus.FAILED)
+            counts.update(
+                db.query(DownloadTable.status, func.count(DownloadTable.id))
+                .group_by(DownloadTable.status)
+                .all()
+            )
         except Exception as e:
-            logger.error(f"Failed to get download counts: {e}")
-            active = queued = completed = failed = 0
+            logger.error("Failed to get download counts: %s", e)
 
-        return {
+        status = {
             "usenet": await get_usenet_status(),
             "downloads": {
-                "active": active,
-                "queued": queued,
-                "completed": completed,
-                "failed": failed,
-                "total": len(downloads) if 'downloads' in locals() else 0
+                "active": counts[DownloadStatus.DOWNLOADING],
+                "queued": counts[DownloadStatus.QUEUED],
+                "completed": counts[DownloadStatus.COMPLETED],
+                "failed": counts[DownloadStatus.FAILED],
+                "total": sum(counts.values())
             },
             "system": await get_system_metrics()
         }
+        _status_cache = (time.monotonic(), status)
+        return status
     except Exception as e:
-        logger.error(f"Failed to get system status: {e}")
+        logger.error("Failed to get system status: %s", e)
         raise HTTPException(
             status_code=500,
             detail="Failed to retrieve system status"
@@ -103,7 +142,12 @@ async def get_system_status(db: Session = Depends(get_db)) -> Dict[str, Any]:
 @router.get("/system/info")
 async def get_system_info() -> Dict[str, Any]:
     """Get system version and operational status"""
+    global _info_cache
     try:
+        cached = _info_cache
+        if cached and time.monotonic() - cached[0] < SYSTEM_INFO_TTL:
+            return cached[1]
+
         # Check core services
         download_service = services.get_download_service()
         queue_service = services.get_queue_manager()
@@ -117,7 +161,7 @@ async def get_system_info() -> Dict[str, Any]:
         
         operational = all(services_status.values())
         
-        return {
+        info = {
             "version": settings.APP_VERSION,
             "status": "operational" if operational else "degraded",
             "services": services_status,
@@ -129,8 +173,10 @@ async def get_system_info() -> Dict[str, Any]:
                 "torrent_enabled": settings.ENABLE_TORRENTS
             }
         }
+        _info_cache = (time.monotonic(), info)
+        return info
     except Exception as e:
-        logger.error(f"Failed to get system info: {e}")
+        logger.error("Failed to get system info: %s", e)
         raise HTTPException(
             status_code=500,
             detail="Failed to retrieve system information"
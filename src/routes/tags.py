@@ -1,10 +1,15 @@
+import hashlib
 import logging
-from typing import List, Optional
-from fastapi import APIRouter, HTTPException, Depends, Path, Query
+import re
+import time
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple, Union
+from fastapi import APIRouter, HTTPException, Depends, Path, Query, Request, Response
+from sqlalchemy import delete, exists, func, insert, literal, select, true
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError
 from ..database import get_db
-from ..models.tables import Tag, Download
+from ..models.tables import Tag, Download, download_tags
 from ..models.schemas import TagCreate, TagUpdate, Tag as TagSchema
 from ..models.enums import TagType
 from ..services_manager import services
@@ -12,8 +17,54 @@ from ..services_manager import services
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/tags", tags=["tags"])
 
+MAX_BATCH_IDS = 1000  # per ID list in a batch tag update
+AUTO_ASSIGN_CHUNK_SIZE = 1000  # matched IDs linked per INSERT when auto-assigning
+
+# Characters that make an auto-assign pattern more than a plain substring
+_REGEX_METACHARS = frozenset(".^$*+?{}[]\\|()")
+
+@lru_cache(maxsize=256)
+def _compile_pattern(pattern: str) -> re.Pattern:
+    """Compile an auto-assign pattern once per distinct pattern string"""
+    return re.compile(pattern)
+
+TAGS_VERSION_TTL = 1.0  # seconds
+
+# (monotonic timestamp, version) of the tags table, see _tags_version
+_tags_version_cache: Optional[Tuple[float, str]] = None
+
+def _invalidate_tags_version() -> None:
+    """Drop the cached tags table version after tags change"""
+    global _tags_version_cache
+    _tags_version_cache = None
+
+def _tags_version(db: Session) -> str:
+    """Fingerprint the tags table by its newest update and row count"""
+    global _tags_version_cache
+    cached = _tags_version_cache
+    if cached and time.monotonic() - cached[0] < TAGS_VERSION_TTL:
+        return cached[1]
+    latest, count = db.query(func.max(Tag.updated_at), func.count(Tag.id)).one()
+    version = f"{latest.isoformat() if latest else ''}:{count}"
+    _tags_version_cache = (time.monotonic(), version)
+    return version
+
+def _etag(*parts: str) -> str:
+    """Build a quoted ETag from the given version parts"""
+    return f'"{hashlib.sha256("|".join(parts).encode()).hexdigest()}"'
+
+def _not_modified(request: Request, response: Response, etag: str) -> Optional[Response]:
+    """Return a 304 when the client's copy is current, otherwise tag the response"""
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
+
 @router.get("/", response_model=List[TagSchema])
-async def list_tags(
+def list_tags(
+    request: Request,
+    response: Response,
     type: Optional[TagType] = None,
     search: Optional[str] = None,
     db: Session = Depends(get_db)
@@ -22,6 +73,10 @@ async def list_tags(
     List all tags with optional filtering
     """
     try:
+        not_modified = _not_modified(request, response, _etag(_tags_version(db), request.url.query))
+        if not_modified:
+            return not_modified
+
         query = db.query(Tag)
         
         if type:
@@ -31,11 +86,11 @@ async def list_tags(
             
         return query.order_by(Tag.name).all()
     except SQLAlchemyError as e:
-        logger.error(f"Database error in list_tags: {e}")
+        logger.error("Database error in list_tags: %s", e)
         raise HTTPException(status_code=500, detail="Database error occurred")
 
 @router.post("/", response_model=TagSchema)
-async def create_tag(
+def create_tag(
     tag: TagCreate,
     db: Session = Depends(get_db)
 ):
@@ -46,6 +101,7 @@ async def create_tag(
         db_tag = Tag(**tag.model_dump())
         db.add(db_tag)
         db.commit()
+        _invalidate_tags_version()
         db.refresh(db_tag)
         return db_tag
     except IntegrityError:
@@ -53,24 +109,27 @@ async def create_tag(
         raise HTTPException(status_code=400, detail="Tag name already exists")
     except Exception as e:
         db.rollback()
-        logger.error(f"Error creating tag: {e}")
+        logger.error("Error creating tag: %s", e)
         raise HTTPException(status_code=500, detail="Failed to create tag")
 
 @router.get("/{tag_id}", response_model=TagSchema)
-async def get_tag(
+def get_tag(
+    request: Request,
+    response: Response,
     tag_id: int = Path(..., ge=1),
     db: Session = Depends(get_db)
 ):
     """
     Get a specific tag by ID
     """
-    tag = db.query(Tag).get(tag_id)
+    tag = db.get(Tag, tag_id)
     if not tag:
         raise HTTPException(status_code=404, detail="Tag not found")
-    return tag
+    not_modified = _not_modified(request, response, _etag(str(tag.id), tag.updated_at.isoformat()))
+    return not_modified or tag
 
 @router.put("/{tag_id}", response_model=TagSchema)
-async def update_tag(
+def update_tag(
     tag_id: int = Path(..., ge=1),
     tag_update: TagUpdate = None,
     db: Session = Depends(get_db)
@@ -79,7 +138,7 @@ async def update_tag(
     Update a tag
     """
     try:
-        db_tag = db.query(Tag).get(tag_id)
+        db_tag = db.get(Tag, tag_id)
         if not db_tag:
             raise HTTPException(status_code=404, detail="Tag not found")
 
@@ -88,6 +147,7 @@ async def update_tag(
             setattr(db_tag, field, value)
 
         db.commit()
+        _invalidate_tags_version()
         db.refresh(db_tag)
         return db_tag
     except IntegrityError:
@@ -95,11 +155,11 @@ async def update_tag(
         raise HTTPException(status_code=400, detail="Tag name already exists")
     except Exception as e:
         db.rollback()
-        logger.error(f"Error updating tag: {e}")
+        logger.error("Error updating tag: %s", e)
         raise HTTPException(status_code=500, detail="Failed to update tag")
 
-@router.delete("/{tag_id}")
-async def delete_tag(
+@router.delete("/{tag_id}", status_code=204, response_class=Response)
+def delete_tag(
     tag_id: int = Path(..., ge=1),
     db: Session = Depends(get_db)
 ):
@@ -107,7 +167,7 @@ async def delete_tag(
     Delete a tag
     """
     try:
-        tag = db.query(Tag).get(tag_id)
+        tag = db.get(Tag, tag_id)
         if not tag:
             raise HTTPException(status_code=404, detail="Tag not found")
             
@@ -116,29 +176,49 @@ async def delete_tag(
             
         db.delete(tag)
         db.commit()
-        return {"message": "Tag deleted successfully"}
+        _invalidate_tags_version()
+        return Response(status_code=204)
     except HTTPException:
         raise
     except Exception as e:
         db.rollback()
-        logger.error(f"Error deleting tag: {e}")
+        logger.error("Error deleting tag: %s", e)
         raise HTTPException(status_code=500, detail="Failed to delete tag")
 
-@router.get("/{tag_id}/downloads", response_model=List[int])
-async def get_tag_downloads(
+@router.get("/{tag_id}/downloads", response_model=Union[List[int], Dict[str, int]])
+def get_tag_downloads(
     tag_id: int = Path(..., ge=1),
+    count_only: bool = Query(False),
     db: Session = Depends(get_db)
 ):
     """
-    Get all download IDs associated with a tag
+    Get all download IDs associated with a tag, or just their count
     """
-    tag = db.query(Tag).get(tag_id)
-    if not tag:
+    if db.query(Tag.id).filter(Tag.id == tag_id).scalar() is None:
         raise HTTPException(status_code=404, detail="Tag not found")
-    return [download.id for download in tag.downloads]
+    if count_only:
+        count = db.query(func.count(download_tags.c.download_id)).filter(download_tags.c.tag_id == tag_id).scalar()
+        return {"count": count}
+    rows = db.query(Download.id).join(Download.tags).filter(Tag.id == tag_id).all()
+    return [download_id for download_id, in rows]
+
+def _link_downloads(db: Session, tag_id: int, download_ids: List[int]) -> int:
+    """Tag the given downloads that don't have the tag yet, returning how many were linked"""
+    result = db.execute(
+        insert(download_tags).from_select(
+            ["download_id", "tag_id"],
+            select(Download.id, literal(tag_id))
+            .where(Download.id.in_(download_ids))
+            .where(~exists().where(
+                (download_tags.c.download_id == Download.id) &
+                (download_tags.c.tag_id == tag_id)
+            ))
+        )
+    )
+    return result.rowcount
 
 @router.post("/{tag_id}/auto-assign")
-async def auto_assign_tag(
+def auto_assign_tag(
     tag_id: int = Path(..., ge=1),
     db: Session = Depends(get_db)
 ):
@@ -146,25 +226,33 @@ async def auto_assign_tag(
     Auto-assign tag to matching downloads based on pattern
     """
     try:
-        tag = db.query(Tag).get(tag_id)
+        tag = db.get(Tag, tag_id)
         if not tag:
             raise HTTPException(status_code=404, detail="Tag not found")
             
         if not tag.auto_assign_pattern:
             raise HTTPException(status_code=400, detail="Tag has no auto-assign pattern")
             
-        import re
-        pattern = re.compile(tag.auto_assign_pattern)
+        search = _compile_pattern(tag.auto_assign_pattern).search
         
-        # Find matching downloads
-        downloads = db.query(Download).all()
-        matched_count = 0
+        # Find matching downloads, fetching only their IDs and names
+        query = db.query(Download.id, Download.name)
+        if _REGEX_METACHARS.isdisjoint(tag.auto_assign_pattern):
+            # Plain substring: let the database discard non-matching rows first
+            query = query.filter(Download.name.contains(tag.auto_assign_pattern, autoescape=True))
         
-        for download in downloads:
-            if pattern.search(download.name):
-                if tag not in download.tags:
-                    download.tags.append(tag)
-                    matched_count += 1
+        # Link matches in bounded chunks as rows stream in, keeping each IN list
+        # under bound-parameter limits
+        matched_count = 0
+        matched_ids = []
+        for download_id, name in query.yield_per(AUTO_ASSIGN_CHUNK_SIZE):
+            if search(name):
+                matched_ids.append(download_id)
+                if len(matched_ids) == AUTO_ASSIGN_CHUNK_SIZE:
+                    matched_count += _link_downloads(db, tag_id, matched_ids)
+                    matched_ids = []
+        if matched_ids:
+            matched_count += _link_downloads(db, tag_id, matched_ids)
         
         db.commit()
         return {
@@ -173,11 +261,11 @@ async def auto_assign_tag(
         }
     except Exception as e:
         db.rollback()
-        logger.error(f"Error auto-assigning tag: {e}")
+        logger.error("Error auto-assigning tag: %s", e)
         raise HTTPException(status_code=500, detail="Failed to auto-assign tag")
 
 @router.post("/batch-update")
-async def batch_update_tags(
+def batch_update_tags(
     download_ids: List[int],
     add_tags: Optional[List[int]] = None,
     remove_tags: Optional[List[int]] = None,
@@ -187,50 +275,70 @@ async def batch_update_tags(
     Batch update tags for multiple downloads
     """
     try:
+        # Drop repeated IDs, keeping the request order
+        download_ids = list(dict.fromkeys(download_ids))
+        add_tags = list(dict.fromkeys(add_tags or []))
+        remove_tags = list(dict.fromkeys(remove_tags or []))
+        
         if not add_tags and not remove_tags:
             raise HTTPException(status_code=400, detail="No tags specified to add or remove")
+        if max(len(download_ids), len(add_tags), len(remove_tags)) > MAX_BATCH_IDS:
+            raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_IDS} IDs per list are allowed")
+        if not download_ids:
+            return {
+                "message": "Tags updated successfully",
+                "affected_downloads": 0
+            }
             
         # Validate downloads exist
-        downloads = db.query(Download).filter(Download.id.in_(download_ids)).all()
-        if len(downloads) != len(download_ids):
+        download_count = db.query(func.count(Download.id)).filter(Download.id.in_(download_ids)).scalar()
+        if download_count != len(download_ids):
             raise HTTPException(status_code=400, detail="One or more invalid download IDs")
             
-        # Process tag additions
+        # Process tag additions: insert every missing (download, tag) pair in one statement
         if add_tags:
-            tags_to_add = db.query(Tag).filter(Tag.id.in_(add_tags)).all()
-            if len(tags_to_add) != len(add_tags):
+            if db.query(func.count(Tag.id)).filter(Tag.id.in_(add_tags)).scalar() != len(add_tags):
                 raise HTTPException(status_code=400, detail="One or more invalid tag IDs to add")
                 
-            for download in downloads:
-                for tag in tags_to_add:
-                    if tag not in download.tags:
-                        download.tags.append(tag)
+            db.execute(
+                insert(download_tags).from_select(
+                    ["download_id", "tag_id"],
+                    select(Download.id, Tag.id)
+                    .join_from(Download, Tag, true())
+                    .where(Download.id.in_(download_ids), Tag.id.in_(add_tags))
+                    .where(~exists().where(
+                        (download_tags.c.download_id == Download.id) &
+                        (download_tags.c.tag_id == Tag.id)
+                    ))
+                )
+            )
                         
         # Process tag removals
         if remove_tags:
-            tags_to_remove = db.query(Tag).filter(Tag.id.in_(remove_tags)).all()
-            if len(tags_to_remove) != len(remove_tags):
+            if db.query(func.count(Tag.id)).filter(Tag.id.in_(remove_tags)).scalar() != len(remove_tags):
                 raise HTTPException(status_code=400, detail="One or more invalid tag IDs to remove")
                 
-            for download in downloads:
-                for tag in tags_to_remove:
-                    if tag in download.tags:
-                        download.tags.remove(tag)
+            db.execute(
+                delete(download_tags).where(
+                    download_tags.c.download_id.in_(download_ids),
+                    download_tags.c.tag_id.in_(remove_tags)
+                )
+            )
                         
         db.commit()
         return {
             "message": "Tags updated successfully",
-            "affected_downloads": len(downloads)
+            "affected_downloads": download_count
         }
     except HTTPException:
         raise
     except Exception as e:
         db.rollback()
-        logger.error(f"Error in batch tag update: {e}")
+        logger.error("Error in batch tag update: %s", e)
         raise HTTPException(status_code=500, detail="Failed to update tags")
 
 @router.post("/merge/{source_id}/{target_id}")
-async def merge_tags(
+def merge_tags(
     source_id: int = Path(..., ge=1),
     target_id: int = Path(..., ge=1),
     db: Session = Depends(get_db)
@@ -242,8 +350,8 @@ async def merge_tags(
         if source_id == target_id:
             raise HTTPException(status_code=400, detail="Cannot merge tag with itself")
             
-        source_tag = db.query(Tag).get(source_id)
-        target_tag = db.query(Tag).get(target_id)
+        source_tag = db.get(Tag, source_id)
+        target_tag = db.get(Tag, target_id)
         
         if not source_tag or not target_tag:
             raise HTTPException(status_code=404, detail="One or both tags not found")
@@ -251,22 +359,37 @@ async def merge_tags(
         if source_tag.tag_type == TagType.SYSTEM:
             raise HTTPException(status_code=403, detail="Cannot merge system tags")
             
-        # Move all downloads from source to target
-        for download in source_tag.downloads:
-            if target_tag not in download.tags:
-                download.tags.append(target_tag)
+        # Tag the source's downloads with the target where they don't have it yet
+        existing = download_tags.alias("existing")
+        db.execute(
+            insert(download_tags).from_select(
+                ["download_id", "tag_id"],
+                select(download_tags.c.download_id, literal(target_id))
+                .where(download_tags.c.tag_id == source_id)
+                .where(~exists().where(
+                    (existing.c.download_id == download_tags.c.download_id) &
+                    (existing.c.tag_id == target_id)
+                ))
+            )
+        )
+        
+        # Drop the source associations, counting the affected downloads before the tag goes
+        affected = db.execute(
+            delete(download_tags).where(download_tags.c.tag_id == source_id)
+        ).rowcount
                 
         # Delete source tag
         db.delete(source_tag)
         db.commit()
+        _invalidate_tags_version()
         
         return {
             "message": "Tags merged successfully",
-            "affected_downloads": len(source_tag.downloads)
+            "affected_downloads": affected
         }
     except HTTPException:
         raise
     except Exception as e:
         db.rollback()
-        logger.error(f"Error merging tags: {e}")
+        logger.error("Error merging tags: %s", e)
         raise HTTPException(status_code=500, detail="Failed to merge tags")
@@ -1,23 +1,31 @@
+import asyncio
+import base64
+import binascii
 import logging
-from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, Query, Path, Request
-from sqlalchemy.orm import Session
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+from fastapi import APIRouter, Depends, HTTPException, Query, Path, Request, Response
+from pydantic import TypeAdapter
+from sqlalchemy import delete, exists, func, insert, literal_column, select, true, tuple_
+from sqlalchemy.orm import Session, selectinload
 from sqlalchemy.exc import IntegrityError
 from ..database import get_db
 from ..models.user import (
-    User, Role, APIKey, AuditLog,
+    User, Role, APIKey, AuditLog, user_roles,
     UserCreate, UserUpdate, UserInDB,
     RoleCreate, RoleUpdate, RoleInDB,
-    APIKeyCreate, APIKeyInDB,
+    APIKeyCreate, APIKeyCreated, APIKeyInDB,
     AuditLogInDB
 )
 from ..auth import (
     get_current_active_user,
     get_password_hash,
+    hash_api_key,
+    API_KEY_PREFIX_LENGTH,
     create_access_token,
     require_admin
 )
-from ..services.audit import create_audit_log
+from ..services.audit import add_audit_batch_listener, enqueue_audit_log
 from datetime import datetime, timedelta
 import secrets
 import json
@@ -25,12 +33,89 @@ import json
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/users", tags=["users"])
 
+USERS_CACHE_TTL = 15.0  # seconds
+AUDIT_LOGS_CACHE_TTL = 30.0  # seconds
+USERS_CACHE_MAX_ENTRIES = 512
+
+_USER_LIST_ADAPTER = TypeAdapter(List[UserInDB])
+_API_KEY_LIST_ADAPTER = TypeAdapter(List[APIKeyInDB])
+_AUDIT_LOG_LIST_ADAPTER = TypeAdapter(List[AuditLogInDB])
+
+# Must match the expression of the idx_users_search_trgm index
+_USER_SEARCH_TEXT = (
+    User.username + literal_column("' '")
+    + func.coalesce(User.email, literal_column("''")) + literal_column("' '")
+    + func.coalesce(User.full_name, literal_column("''"))
+)
+
+def _escape_like(value: str) -> str:
+    """Escape LIKE wildcards so a search term matches literally"""
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+# (endpoint, admin id, *params) -> (monotonic timestamp, JSON body, next cursor)
+_response_cache: Dict[Tuple[Any, ...], Tuple[float, bytes, Optional[str]]] = {}
+
+def _json_response(body: bytes, next_cursor: Optional[str], cache_status: str) -> Response:
+    """Build a JSON response carrying the cache status and next-page cursor"""
+    headers = {"X-Cache": cache_status}
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+    return Response(content=body, media_type="application/json", headers=headers)
+
+def _cached_response(key: Tuple[Any, ...], ttl: float) -> Optional[Response]:
+    """Return the cached response for key if it is younger than ttl"""
+    cached = _response_cache.get(key)
+    if cached and time.monotonic() - cached[0] < ttl:
+        return _json_response(cached[1], cached[2], "HIT")
+    return None
+
+def _store_response(key: Tuple[Any, ...], body: bytes, next_cursor: Optional[str] = None) -> Response:
+    """Cache a freshly built response body and return it"""
+    if len(_response_cache) >= USERS_CACHE_MAX_ENTRIES:
+        _response_cache.clear()
+    _response_cache[key] = (time.monotonic(), body, next_cursor)
+    return _json_response(body, next_cursor, "MISS")
+
+def _invalidate_user_cache() -> None:
+    """Drop cached user responses after a write"""
+    _response_cache.clear()
+
+def _invalidate_audit_log_cache(user_ids: Set[Optional[int]]) -> None:
+    """Drop cached audit log pages of users whose new entries were just written"""
+    for key in [key for key in _response_cache if key[0] == "audit_logs" and key[2] in user_ids]:
+        del _response_cache[key]
+
+add_audit_batch_listener(_invalidate_audit_log_cache)
+
+def _encode_cursor(created_at: datetime, row_id: int) -> str:
+    """Encode a (created_at, id) keyset position as an opaque cursor"""
+    raw = f"{created_at.isoformat()}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def _decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Decode a cursor produced by _encode_cursor"""
+    try:
+        created_at, row_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def _require_user_and_role(db: Session, user_id: int, role_id: int) -> None:
+    """Raise 404 if the user or role does not exist"""
+    if db.query(User.id).filter(User.id == user_id).scalar() is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    if db.query(Role.id).filter(Role.id == role_id).scalar() is None:
+        raise HTTPException(status_code=404, detail="Role not found")
+
 @router.get("/me", response_model=UserInDB)
 async def get_current_user_info(
     current_user: User = Depends(get_current_active_user)
 ):
     """Get current user information"""
-    return current_user
+    return Response(
+        content=UserInDB.model_validate(current_user).model_dump_json(),
+        media_type="application/json"
+    )
 
 @router.patch("/me", response_model=UserInDB)
 async def update_current_user(
@@ -42,23 +127,27 @@ async def update_current_user(
     """Update current user information"""
     try:
         # Update user fields
-        for field, value in user_update.dict(exclude_unset=True).items():
-            if field == "password":
-                value = get_password_hash(value)
+        updates = user_update.model_dump(exclude_unset=True)
+        fields_updated = list(updates)
+        if "password" in updates:
+            # bcrypt is slow, so hash in a worker thread to keep the event loop free
+            updates["hashed_password"] = await asyncio.to_thread(
+                get_password_hash, updates.pop("password")
+            )
+        for field, value in updates.items():
             setattr(current_user, field, value)
         
         current_user.updated_at = datetime.utcnow()
         db.commit()
-        db.refresh(current_user)
+        _invalidate_user_cache()
         
         # Audit log
-        await create_audit_log(
-            db=db,
+        enqueue_audit_log(
             user_id=current_user.id,
             action="UPDATE",
             resource_type="USER",
             resource_id=current_user.id,
-            details={"fields_updated": list(user_update.dict(exclude_unset=True).keys())},
+            details={"fields_updated": fields_updated},
             request=request
         )
         
@@ -72,21 +161,30 @@ async def update_current_user(
 async def list_users(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
+    after_id: Optional[int] = Query(None, ge=1),
     search: Optional[str] = None,
     role: Optional[str] = None,
     is_active: Optional[bool] = None,
-    _: User = Depends(require_admin),
+    current_user: User = Depends(require_admin),
     db: Session = Depends(get_db)
 ):
-    """List users with filtering and pagination"""
-    query = db.query(User)
+    """
+    List users with filtering and pagination
+
+    Pages can be fetched with keyset pagination by passing the X-Next-Cursor
+    header of the previous page as ``after_id``.
+    """
+    cache_key = ("list", current_user.id, skip, limit, after_id, search, role, is_active)
+    cached = _cached_response(cache_key, USERS_CACHE_TTL)
+    if cached:
+        return cached
+    
+    # Load roles for the whole page in one extra SELECT instead of one per user
+    query = db.query(User).options(selectinload(User.roles)).order_by(User.id.asc())
     
     if search:
-        query = query.filter(
-            (User.username.ilike(f"%{search}%")) |
-            (User.email.ilike(f"%{search}%")) |
-            (User.full_name.ilike(f"%{search}%"))
-        )
+        # ILIKE rather than lower() LIKE, so PostgreSQL can use the trigram index
+        query = query.filter(_USER_SEARCH_TEXT.ilike(f"%{_escape_like(search)}%", escape="\\"))
     
     if role:
         query = query.join(User.roles).filter(Role.name == role)
@@ -94,7 +192,18 @@ async def list_users(
     if is_active is not None:
         query = query.filter(User.is_active == is_active)
     
-    return query.offset(skip).limit(limit).all()
+    # Seek past the last seen ID instead of scanning the offset
+    if after_id is not None:
+        query = query.filter(User.id > after_id)
+    else:
+        query = query.offset(skip)
+    users = query.limit(limit).all()
+    
+    next_cursor = str(users[-1].id) if len(users) == limit else None
+    body = _USER_LIST_ADAPTER.dump_json(
+        _USER_LIST_ADAPTER.validate_python(users, from_attributes=True)
+    )
+    return _store_response(cache_key, body, next_cursor)
 
 @router.post("/", response_model=UserInDB)
 async def create_user(
@@ -109,16 +218,16 @@ async def create_user(
             username=user_create.username,
             email=user_create.email,
             full_name=user_create.full_name,
-            hashed_password=get_password_hash(user_create.password),
-            is_active=user_create.is_active
+            hashed_password=await asyncio.to_thread(get_password_hash, user_create.password),
+            is_active=user_create.is_active,
+            roles=[]
         )
         db.add(db_user)
         db.commit()
-        db.refresh(db_user)
+        _invalidate_user_cache()
         
         # Audit log
-        await create_audit_log(
-            db=db,
+        enqueue_audit_log(
             user_id=db_user.id,
             action="CREATE",
             resource_type="USER",
@@ -138,14 +247,19 @@ async def create_user(
 @router.get("/{user_id}", response_model=UserInDB)
 async def get_user(
     user_id: int = Path(..., ge=1),
-    _: User = Depends(require_admin),
+    current_user: User = Depends(require_admin),
     db: Session = Depends(get_db)
 ):
     """Get user by ID"""
-    user = db.query(User).get(user_id)
+    cache_key = ("user", current_user.id, user_id)
+    cached = _cached_response(cache_key, USERS_CACHE_TTL)
+    if cached:
+        return cached
+    
+    user = db.get(User, user_id, options=[selectinload(User.roles)])
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
-    return user
+    return _store_response(cache_key, UserInDB.model_validate(user).model_dump_json().encode())
 
 @router.delete("/{user_id}")
 async def delete_user(
@@ -158,14 +272,13 @@ async def delete_user(
     if user_id == current_user.id:
         raise HTTPException(status_code=400, detail="Cannot delete own account")
         
-    user = db.query(User).get(user_id)
+    user = db.get(User, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
     try:
         # Audit log before deletion
-        await create_audit_log(
-            db=db,
+        enqueue_audit_log(
             user_id=current_user.id,
             action="DELETE",
             resource_type="USER",
@@ -175,6 +288,7 @@ async def delete_user(
         
         db.delete(user)
         db.commit()
+        _invalidate_user_cache()
         return {"message": "User deleted successfully"}
     except Exception as e:
         db.rollback()
@@ -190,31 +304,39 @@ async def assign_role(
     db: Session = Depends(get_db)
 ):
     """Assign a role to a user"""
-    user = db.query(User).get(user_id)
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-        
-    role = db.query(Role).get(role_id)
-    if not role:
-        raise HTTPException(status_code=404, detail="Role not found")
-    
     try:
-        if role not in user.roles:
-            user.roles.append(role)
-            db.commit()
-            
-            # Audit log
-            await create_audit_log(
-                db=db,
-                user_id=current_user.id,
-                action="ASSIGN_ROLE",
-                resource_type="USER",
-                resource_id=user_id,
-                details={"role_id": role_id},
-                request=request
+        # Insert the membership only if both rows exist and it is not already present
+        result = db.execute(
+            insert(user_roles).from_select(
+                ["user_id", "role_id"],
+                select(User.id, Role.id)
+                .join_from(User, Role, true())
+                .where(User.id == user_id, Role.id == role_id)
+                .where(~exists().where(
+                    (user_roles.c.user_id == User.id) &
+                    (user_roles.c.role_id == Role.id)
+                ))
             )
+        )
+        if result.rowcount == 0:
+            _require_user_and_role(db, user_id, role_id)
+            return {"message": "Role assigned successfully"}
+        db.commit()
+        _invalidate_user_cache()
+        
+        # Audit log
+        enqueue_audit_log(
+            user_id=current_user.id,
+            action="ASSIGN_ROLE",
+            resource_type="USER",
+            resource_id=user_id,
+            details={"role_id": role_id},
+            request=request
+        )
             
         return {"message": "Role assigned successfully"}
+    except HTTPException:
+        raise
     except Exception as e:
         db.rollback()
         logger.error(f"Error assigning role: {e}")
@@ -229,37 +351,38 @@ async def remove_role(
     db: Session = Depends(get_db)
 ):
     """Remove a role from a user"""
-    user = db.query(User).get(user_id)
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-        
-    role = db.query(Role).get(role_id)
-    if not role:
-        raise HTTPException(status_code=404, detail="Role not found")
-    
     try:
-        if role in user.roles:
-            user.roles.remove(role)
-            db.commit()
-            
-            # Audit log
-            await create_audit_log(
-                db=db,
-                user_id=current_user.id,
-                action="REMOVE_ROLE",
-                resource_type="USER",
-                resource_id=user_id,
-                details={"role_id": role_id},
-                request=request
+        result = db.execute(
+            delete(user_roles).where(
+                user_roles.c.user_id == user_id,
+                user_roles.c.role_id == role_id
             )
+        )
+        if result.rowcount == 0:
+            _require_user_and_role(db, user_id, role_id)
+            return {"message": "Role removed successfully"}
+        db.commit()
+        _invalidate_user_cache()
+        
+        # Audit log
+        enqueue_audit_log(
+            user_id=current_user.id,
+            action="REMOVE_ROLE",
+            resource_type="USER",
+            resource_id=user_id,
+            details={"role_id": role_id},
+            request=request
+        )
             
         return {"message": "Role removed successfully"}
+    except HTTPException:
+        raise
     except Exception as e:
         db.rollback()
         logger.error(f"Error removing role: {e}")
         raise HTTPException(status_code=500, detail="Failed to remove role")
 
-@router.post("/{user_id}/api-keys", response_model=APIKeyInDB)
+@router.post("/{user_id}/api-keys", response_model=APIKeyCreated)
 async def create_api_key(
     api_key_create: APIKeyCreate,
     user_id: int = Path(..., ge=1),
@@ -268,16 +391,17 @@ async def create_api_key(
     db: Session = Depends(get_db)
 ):
     """Create an API key for a user"""
-    user = db.query(User).get(user_id)
-    if not user:
+    if db.query(User.id).filter(User.id == user_id).scalar() is None:
         raise HTTPException(status_code=404, detail="User not found")
     
     try:
         # Generate API key
         key = secrets.token_urlsafe(32)
         
+        # Only a digest is stored; the raw key is returned once below
         db_api_key = APIKey(
-            key=key,
+            key_prefix=key[:API_KEY_PREFIX_LENGTH],
+            key_hash=hash_api_key(key),
             name=api_key_create.name,
             user_id=user_id,
             scopes=json.dumps(api_key_create.scopes),
@@ -285,11 +409,10 @@ async def create_api_key(
         )
         db.add(db_api_key)
         db.commit()
-        db.refresh(db_api_key)
+        _invalidate_user_cache()
         
         # Audit log
-        await create_audit_log(
-            db=db,
+        enqueue_audit_log(
             user_id=current_user.id,
             action="CREATE_API_KEY",
             resource_type="USER",
@@ -298,7 +421,10 @@ async def create_api_key(
             request=request
         )
         
-        return db_api_key
+        return APIKeyCreated(
+            **APIKeyInDB.model_validate(db_api_key).model_dump(),
+            key=key
+        )
     except Exception as e:
         db.rollback()
         logger.error(f"Error creating API key: {e}")
@@ -307,15 +433,23 @@ async def create_api_key(
 @router.get("/{user_id}/api-keys", response_model=List[APIKeyInDB])
 async def list_api_keys(
     user_id: int = Path(..., ge=1),
-    _: User = Depends(require_admin),
+    current_user: User = Depends(require_admin),
     db: Session = Depends(get_db)
 ):
     """List API keys for a user"""
-    user = db.query(User).get(user_id)
+    cache_key = ("api_keys", current_user.id, user_id)
+    cached = _cached_response(cache_key, USERS_CACHE_TTL)
+    if cached:
+        return cached
+    
+    user = db.get(User, user_id, options=[selectinload(User.api_keys)])
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    return user.api_keys
+    body = _API_KEY_LIST_ADAPTER.dump_json(
+        _API_KEY_LIST_ADAPTER.validate_python(user.api_keys, from_attributes=True)
+    )
+    return _store_response(cache_key, body)
 
 @router.delete("/{user_id}/api-keys/{api_key_id}")
 async def delete_api_key(
@@ -336,8 +470,7 @@ async def delete_api_key(
     
     try:
         # Audit log before deletion
-        await create_audit_log(
-            db=db,
+        enqueue_audit_log(
             user_id=current_user.id,
             action="DELETE_API_KEY",
             resource_type="USER",
@@ -348,6 +481,7 @@ async def delete_api_key(
         
         db.delete(api_key)
         db.commit()
+        _invalidate_user_cache()
         return {"message": "API key deleted successfully"}
     except Exception as e:
         db.rollback()
@@ -359,16 +493,40 @@ async def get_user_audit_logs(
     user_id: int = Path(..., ge=1),
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
-    _: User = Depends(require_admin),
+    cursor: Optional[str] = Query(None),
+    current_user: User = Depends(require_admin),
     db: Session = Depends(get_db)
 ):
-    """Get audit logs for a user"""
-    user = db.query(User).get(user_id)
-    if not user:
+    """
+    Get audit logs for a user, newest first
+
+    Pages can be fetched with keyset pagination by passing the X-Next-Cursor
+    header of the previous page as ``cursor``.
+    """
+    cache_key = ("audit_logs", current_user.id, user_id, skip, limit, cursor)
+    cached = _cached_response(cache_key, AUDIT_LOGS_CACHE_TTL)
+    if cached:
+        return cached
+    
+    if db.query(User.id).filter(User.id == user_id).scalar() is None:
         raise HTTPException(status_code=404, detail="User not found")
     
-    return db.query(AuditLog).filter(
+    query = db.query(AuditLog).filter(
         AuditLog.user_id == user_id
     ).order_by(
-        AuditLog.created_at.desc()
-    ).offset(skip).limit(limit).all()
+        AuditLog.created_at.desc(), AuditLog.id.desc()
+    )
+    if cursor:
+        created_at, log_id = _decode_cursor(cursor)
+        query = query.filter(
+            tuple_(AuditLog.created_at, AuditLog.id) < tuple_(created_at, log_id)
+        )
+    else:
+        query = query.offset(skip)
+    logs = query.limit(limit).all()
+    
+    next_cursor = _encode_cursor(logs[-1].created_at, logs[-1].id) if len(logs) == limit else None
+    body = _AUDIT_LOG_LIST_ADAPTER.dump_json(
+        _AUDIT_LOG_LIST_ADAPTER.validate_python(logs, from_attributes=True)
+    )
+    return _store_response(cache_key, body, next_cursor)
@@ -1,7 +1,8 @@
 import logging
-import json
 import asyncio
-from typing import Optional, Dict, Any
+from datetime import datetime
+from typing import Optional, Dict, Any, List
+import orjson
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, HTTPException, Depends
 from ..websocket_manager import manager
 from ..models.schemas import DownloadProgress
@@ -11,6 +12,9 @@ from ..config import settings
 logger = logging.getLogger(__name__)
 router = APIRouter(tags=["websocket"])
 
+DOWNLOAD_UPDATE_INTERVAL = 0.1  # seconds between update batches, caps sends at 10 Hz
+MAX_CLIENT_MESSAGE_SIZE = 64 * 1024  # characters
+
 class WebSocketMessage:
     """Base class for WebSocket messages"""
     def __init__(self, type: str, data: Dict[str, Any]):
@@ -18,11 +22,14 @@ class WebSocketMessage:
         self.data = data
 
     def to_json(self) -> str:
-        return json.dumps({
+        return orjson.dumps({
             "type": self.type,
             "data": self.data,
-            "timestamp": settings.current_time
-        })
+            "timestamp": datetime.utcnow()
+        }).decode()
+
+# Heartbeats carry no data, so the frame is encoded once and reused
+HEARTBEAT = orjson.dumps({"type": "heartbeat", "data": {}}).decode()
 
 class ProgressMessage(WebSocketMessage):
     """Download progress message"""
@@ -42,6 +49,22 @@ class ErrorMessage(WebSocketMessage):
             "details": details or {}
         })
 
+def _conflate_updates(updates: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Keep only the latest DEBUG log entry, preserving every other update in order
+
+    Per-download queues carry log entries from broadcast_download_log; DEBUG lines
+    are per-segment chatter superseded by the next one, while INFO and above are
+    always delivered.
+    """
+    last_debug = max(
+        (i for i, update in enumerate(updates) if update.get("level") == "DEBUG"),
+        default=None
+    )
+    return [
+        update for i, update in enumerate(updates)
+        if update.get("level") != "DEBUG" or i == last_debug
+    ]
+
 @router.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     """Main WebSocket endpoint for real-time updates"""
@@ -54,27 +77,24 @@ async def websocket_endpoint(websocket: WebSocket):
             status = await system_service.get_status()
             await websocket.send_text(StatusMessage(status).to_json())
 
+        # Heartbeats are sent to every connection by heartbeat_sender
         while True:
-            try:
-                # Wait for messages with timeout
-                data = await asyncio.wait_for(
-                    websocket.receive_text(),
-                    timeout=settings.WS_HEARTBEAT_INTERVAL
+            data = await websocket.receive_text()
+            
+            if len(data) > MAX_CLIENT_MESSAGE_SIZE:
+                logger.warning(f"Rejected {len(data)} character WebSocket message")
+                await websocket.send_text(
+                    ErrorMessage("Message too large").to_json()
                 )
-                
-                try:
-                    message = json.loads(data)
-                    await process_message(websocket, message)
-                except json.JSONDecodeError:
-                    logger.warning(f"Invalid JSON received: {data}")
-                    await websocket.send_text(
-                        ErrorMessage("Invalid JSON format").to_json()
-                    )
-                    
-            except asyncio.TimeoutError:
-                # Send heartbeat
+                continue
+            
+            try:
+                message = orjson.loads(data)
+                await process_message(websocket, message)
+            except orjson.JSONDecodeError:
+                logger.warning(f"Invalid JSON received: {data}")
                 await websocket.send_text(
-                    WebSocketMessage("heartbeat", {}).to_json()
+                    ErrorMessage("Invalid JSON format").to_json()
                 )
                 
     except WebSocketDisconnect:
@@ -117,26 +137,32 @@ async def download_websocket(websocket: WebSocket, download_id: int):
         while True:
             try:
                 # Wait for updates with timeout
-                update = await asyncio.wait_for(
+                updates = [await asyncio.wait_for(
                     queue.get(),
                     timeout=settings.WS_HEARTBEAT_INTERVAL
-                )
-                
-                await websocket.send_text(json.dumps(update))
+                )]
                 queue.task_done()
                 
+                # Drain whatever piled up since the last batch
+                while True:
+                    try:
+                        updates.append(queue.get_nowait())
+                    except asyncio.QueueEmpty:
+                        break
+                    queue.task_done()
+                
+                for update in _conflate_updates(updates):
+                    await websocket.send_text(orjson.dumps(update).decode())
+                await asyncio.sleep(DOWNLOAD_UPDATE_INTERVAL)
+                
             except asyncio.TimeoutError:
-                # Send heartbeat and check download still exists
+                # Check the download still exists; heartbeat_sender keeps the socket alive
                 download = await download_service.get_download(download_id)
                 if not download:
                     await websocket.send_text(
                         ErrorMessage("Download no longer exists").to_json()
                     )
                     break
-                    
-                await websocket.send_text(
-                    WebSocketMessage("heartbeat", {}).to_json()
-                )
                 
     except WebSocketDisconnect:
         manager.disconnect(websocket)
@@ -181,6 +207,27 @@ async def process_message(websocket: WebSocket, message: Dict[str, Any]):
             ErrorMessage("Error processing message").to_json()
         )
 
+async def heartbeat_sender() -> None:
+    """Send the shared heartbeat frame to every connected client once per interval"""
+    while True:
+        await asyncio.sleep(settings.WS_HEARTBEAT_INTERVAL)
+        try:
+            await manager.broadcast(HEARTBEAT)
+        except Exception as e:
+            logger.error(f"Failed to send heartbeats: {e}")
+
+async def system_status_publisher() -> None:
+    """Fetch system status once per interval and publish it to all /ws/system clients"""
+    while True:
+        try:
+            system_service = services.get_system_service()
+            if system_service:
+                status = await system_service.get_status()
+                await manager.publish_status(StatusMessage(status).to_json())
+        except Exception as e:
+            logger.error(f"Failed to publish system status: {e}")
+        await asyncio.sleep(settings.SYSTEM_STATUS_INTERVAL)
+
 @router.websocket("/ws/system")
 async def system_websocket(websocket: WebSocket):
     """WebSocket endpoint for system status updates"""
@@ -194,16 +241,12 @@ async def system_websocket(websocket: WebSocket):
             )
             return
             
+        # Statuses are produced by system_status_publisher, not per client
+        if manager.latest_status:
+            await websocket.send_text(manager.latest_status)
         while True:
             try:
-                # Get system status every interval
-                status = await system_service.get_status()
-                await websocket.send_text(
-                    StatusMessage(status).to_json()
-                )
-                
-                await asyncio.sleep(settings.SYSTEM_STATUS_INTERVAL)
-                
+                await websocket.send_text(await manager.wait_for_status())
             except asyncio.CancelledError:
                 break
                 
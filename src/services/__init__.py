@@ -1,3 +0,0 @@
-from .services_manager import ServicesManager
-
-services = ServicesManager()
@@ -1,13 +1,100 @@
+import asyncio
 import logging
-from typing import Optional, Dict, Any
+from typing import Callable, Optional, Dict, Any, List, Set
 from fastapi import Request
+from sqlalchemy import case, delete, func, insert, select
 from sqlalchemy.orm import Session
+from ..database import SessionLocal
 from ..models.user import AuditLog
 from datetime import datetime
 import json
 
 logger = logging.getLogger(__name__)
 
+AUDIT_BATCH_SIZE = 100
+AUDIT_FLUSH_INTERVAL = 0.2  # seconds
+AUDIT_CLEANUP_BATCH_SIZE = 5000
+
+# Audit entries waiting to be written by audit_log_writer
+_audit_queue: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue()
+
+# Called with the user IDs of every batch audit_log_writer commits
+_batch_listeners: List[Callable[[Set[Optional[int]]], None]] = []
+
+def add_audit_batch_listener(callback: Callable[[Set[Optional[int]]], None]) -> None:
+    """Register a callback to run after each queued batch is written"""
+    _batch_listeners.append(callback)
+
+def enqueue_audit_log(
+    user_id: Optional[int],
+    action: str,
+    resource_type: str,
+    resource_id: Optional[int] = None,
+    details: Optional[Dict[str, Any]] = None,
+    request: Optional[Request] = None,
+    success: bool = True,
+    error: Optional[str] = None
+) -> None:
+    """Queue an audit log entry to be written in the background"""
+    _audit_queue.put_nowait({
+        "user_id": user_id,
+        "action": action,
+        "resource_type": resource_type,
+        "resource_id": resource_id,
+        "details": json.dumps(details) if details else None,
+        "ip_address": request.client.host if request else None,
+        "user_agent": request.headers.get("user-agent") if request else None,
+        "success": success,
+        "error": error,
+        "created_at": datetime.utcnow()
+    })
+
+def _write_audit_batch(entries: List[Dict[str, Any]]) -> bool:
+    """Insert a batch of audit entries in one transaction"""
+    db = SessionLocal()
+    try:
+        db.execute(insert(AuditLog), entries)
+        db.commit()
+        return True
+    except Exception as e:
+        logger.error(f"Failed to write {len(entries)} audit logs: {e}")
+        db.rollback()
+        return False
+    finally:
+        db.close()
+
+def _notify_batch_written(entries: List[Dict[str, Any]]) -> None:
+    """Tell the registered listeners whose audit logs just changed"""
+    user_ids = {entry["user_id"] for entry in entries}
+    for callback in _batch_listeners:
+        callback(user_ids)
+
+async def audit_log_writer() -> None:
+    """Drain queued audit entries into the database in batches until cancelled"""
+    loop = asyncio.get_running_loop()
+    batch: List[Dict[str, Any]] = []
+    try:
+        while True:
+            batch.append(await _audit_queue.get())
+            deadline = loop.time() + AUDIT_FLUSH_INTERVAL
+            while len(batch) < AUDIT_BATCH_SIZE:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(_audit_queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            pending, batch = batch, []
+            if await asyncio.to_thread(_write_audit_batch, pending):
+                _notify_batch_written(pending)
+    finally:
+        # Flush whatever is still queued when the writer stops
+        while not _audit_queue.empty():
+            batch.append(_audit_queue.get_nowait())
+        if batch and _write_audit_batch(batch):
+            _notify_batch_written(batch)
+
 async def create_audit_log(
     db: Session,
     user_id: Optional[int],
@@ -15,9 +102,16 @@ async def create_audit_log(
     resource_type: str,
     resource_id: Optional[int] = None,
     details: Optional[Dict[str, Any]] = None,
-    request: Optional[Request] = None
+    request: Optional[Request] = None,
+    success: bool = True,
+    error: Optional[str] = None
 ) -> AuditLog:
-    """Create an audit log entry"""
+    """
+    Create an audit log entry synchronously
+
+    Request handlers should prefer enqueue_audit_log, which keeps the insert
+    and its commit off the request path.
+    """
     try:
         # Get request information if available
         ip_address = None
@@ -35,12 +129,13 @@ async def create_audit_log(
             details=json.dumps(details) if details else None,
             ip_address=ip_address,
             user_agent=user_agent,
+            success=success,
+            error=error,
             created_at=datetime.utcnow()
         )
         
         db.add(audit_log)
         db.commit()
-        db.refresh(audit_log)
         
         return audit_log
     except Exception as e:
@@ -84,13 +179,9 @@ class AuditLogger:
         
         # Create audit log
         details = {
-            "duration": (self.end_time - self.start_time).total_seconds(),
-            "success": self.success
+            "duration": (self.end_time - self.start_time).total_seconds()
         }
         
-        if self.error:
-            details["error"] = self.error
-        
         await create_audit_log(
             db=self.db,
             user_id=self.user_id,
@@ -98,7 +189,9 @@ class AuditLogger:
             resource_type=self.resource_type,
             resource_id=self.resource_id,
             details=details,
-            request=self.request
+            request=self.request,
+            success=self.success,
+            error=self.error
         )
         
         # Don't suppress exceptions
@@ -132,9 +225,7 @@ async def get_audit_logs(
     if end_date:
         query = query.filter(AuditLog.created_at <= end_date)
     if success_only:
-        query = query.filter(
-            AuditLog.details.like('%"success": true%')
-        )
+        query = query.filter(AuditLog.success.is_(True))
     
     return query.order_by(
         AuditLog.created_at.desc()
@@ -146,45 +237,35 @@ async def get_audit_summary(
     end_date: Optional[datetime] = None
 ) -> Dict[str, Any]:
     """Get summary of audit logs"""
-    query = db.query(AuditLog)
+    # Aggregate once over (action, resource_type, user_id) and roll the
+    # groups up in Python rather than scanning the table once per breakdown
+    query = db.query(
+        AuditLog.action,
+        AuditLog.resource_type,
+        AuditLog.user_id,
+        func.count(AuditLog.id),
+        func.sum(case((AuditLog.success.is_(True), 1), else_=0)),
+        func.sum(case((AuditLog.error.isnot(None), 1), else_=0))
+    )
     
     if start_date:
         query = query.filter(AuditLog.created_at >= start_date)
     if end_date:
         query = query.filter(AuditLog.created_at <= end_date)
     
-    # Get total counts
-    total_logs = query.count()
-    success_logs = query.filter(
-        AuditLog.details.like('%"success": true%')
-    ).count()
-    error_logs = query.filter(
-        AuditLog.details.like('%"error"%')
-    ).count()
-    
-    # Get counts by action
-    action_counts = {}
-    for action, count in db.query(
-        AuditLog.action,
-        db.func.count(AuditLog.id)
-    ).group_by(AuditLog.action).all():
-        action_counts[action] = count
-    
-    # Get counts by resource type
-    resource_counts = {}
-    for resource_type, count in db.query(
-        AuditLog.resource_type,
-        db.func.count(AuditLog.id)
-    ).group_by(AuditLog.resource_type).all():
-        resource_counts[resource_type] = count
-    
-    # Get most active users
-    user_counts = {}
-    for user_id, count in db.query(
-        AuditLog.user_id,
-        db.func.count(AuditLog.id)
-    ).group_by(AuditLog.user_id).all():
-        user_counts[str(user_id)] = count
+    total_logs = success_logs = error_logs = 0
+    action_counts: Dict[str, int] = {}
+    resource_counts: Dict[str, int] = {}
+    user_counts: Dict[str, int] = {}
+    for action, resource_type, user_id, count, successes, errors in query.group_by(
+        AuditLog.action, AuditLog.resource_type, AuditLog.user_id
+    ):
+        total_logs += count
+        success_logs += successes or 0
+        error_logs += errors or 0
+        action_counts[action] = action_counts.get(action, 0) + count
+        resource_counts[resource_type] = resource_counts.get(resource_type, 0) + count
+        user_counts[str(user_id)] = user_counts.get(str(user_id), 0) + count
     
     return {
         "total_logs": total_logs,
@@ -202,13 +283,25 @@ async def cleanup_audit_logs(
     dry_run: bool = True
 ) -> Dict[str, Any]:
     """Clean up old audit logs"""
-    query = db.query(AuditLog).filter(AuditLog.created_at < before_date)
-    count = query.count()
-    
-    if not dry_run:
+    if dry_run:
+        count = db.query(func.count(AuditLog.id)).filter(
+            AuditLog.created_at < before_date
+        ).scalar()
+    else:
+        # Delete in bounded batches so each transaction (and its journal) stays small
+        count = 0
         try:
-            query.delete()
-            db.commit()
+            while True:
+                batch_ids = select(AuditLog.id).where(
+                    AuditLog.created_at < before_date
+                ).limit(AUDIT_CLEANUP_BATCH_SIZE).scalar_subquery()
+                deleted = db.execute(
+                    delete(AuditLog).where(AuditLog.id.in_(batch_ids))
+                ).rowcount
+                db.commit()
+                count += deleted
+                if deleted < AUDIT_CLEANUP_BATCH_SIZE:
+                    break
         except Exception as e:
             logger.error(f"Failed to cleanup audit logs: {e}")
             db.rollback()
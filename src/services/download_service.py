@@ -1,13 +1,77 @@
-import logging\n\nlogger = logging.getLogger(__name__)\n
-from typing import Optional, Dict, List
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Iterator, Optional, Dict, List, Tuple, Union
 from datetime import datetime
+from sqlalchemy import String, and_, cast, literal, not_, or_, select, update
 from sqlalchemy.orm import Session
 from ..database import SessionLocal
 from ..models.tables import DownloadTable, DownloadStatus, DownloadType
-from ..models.download import Download
+from ..models.schemas import Download
 from ..models.tables import DownloadTable
-import json
 import os
+import re
+from io import BytesIO, StringIO
+import orjson
+
+# Part counters such as [01/15] or (1/15) and quoted names in NZB subjects
+_NZB_PART_COUNTER_RE = re.compile(r'\[\d+/\d+\]|\(\d+/\d+\)')
+_NZB_QUOTED_RE = re.compile(r'"([^"]+)"')
+# Namespace-qualified NZB tags as ElementTree reports them
+_NZB_NS = "{http://www.newzbin.com/DTD/2003/nzb}"
+_NZB_META_TAG = f"{_NZB_NS}meta"
+_NZB_FILE_TAG = f"{_NZB_NS}file"
+
+# Columns read when listing downloads, fetched as plain rows rather than ORM objects
+_DOWNLOAD_COLUMNS = (
+    DownloadTable.id,
+    DownloadTable.name,
+    DownloadTable.url,
+    DownloadTable.status,
+    DownloadTable.progress,
+    DownloadTable.download_type,
+    DownloadTable.download_path,
+    DownloadTable.speed,
+    DownloadTable.eta,
+    DownloadTable.error_message,
+    DownloadTable.queue_position,
+    DownloadTable.queued_at,
+    DownloadTable.created_at,
+    DownloadTable.updated_at,
+)
+DOWNLOAD_LIST_YIELD_PER = 500
+
+# str enums hash like their values, so these accept either form from the driver
+_DOWNLOAD_STATUSES = {status.value: status for status in DownloadStatus}
+_DOWNLOAD_TYPES = {download_type.value: download_type for download_type in DownloadType}
+# Torrent client states that map directly onto a download status
+_TORRENT_STATE_MAP = {
+    "downloading": DownloadStatus.DOWNLOADING,
+    "paused": DownloadStatus.PAUSED,
+}
+# Indexed by whether a torrent has finished, for states not in _TORRENT_STATE_MAP
+_TORRENT_COMPLETION_STATUS = (None, DownloadStatus.COMPLETED)
+
+MAPPING_LOG_COMPACT_SLACK = 100  # superseded log entries tolerated before compacting
+MAPPING_FLUSH_DELAY = 0.2  # seconds to coalesce mapping changes before writing
+
+# Torrent ID -> status looked up during the current request, see torrent_status_scope
+_torrent_status_cache: ContextVar[Optional[Dict[str, Any]]] = ContextVar(
+    "torrent_status_cache", default=None
+)
+
+@contextmanager
+def torrent_status_scope() -> Iterator[None]:
+    """Memoize torrent status lookups until the scope exits"""
+    token = _torrent_status_cache.set({})
+    try:
+        yield
+    finally:
+        _torrent_status_cache.reset(token)
 
 class DownloadService:
     def __init__(self):
@@ -15,35 +79,141 @@ class DownloadService:
         self.nzb_downloader = None
         # Map download IDs to torrent IDs
         self.download_to_torrent_map: Dict[int, str] = {}
-        self.mappings_file = "./data/torrent_mappings.json"
+        # Append-only log of mapping changes, replayed on startup
+        self.mappings_file = "./data/torrent_mappings.log"
+        self.legacy_mappings_file = "./data/torrent_mappings.json"
+        self._mapping_log_entries = 0
+        self._pending_mappings: List[bytes] = []
+        self._mapping_flush_task: Optional[asyncio.Task] = None
+        # Download ID -> (type, torrent ID) so hot paths can skip the row lookup
+        self._download_meta: Dict[int, Tuple[DownloadType, Optional[str]]] = {}
         self._load_torrent_mappings()
+        self._load_download_meta()
 
     def _load_torrent_mappings(self):
-        """Load torrent mappings from persistent storage"""
+        """Load torrent mappings by replaying the mapping log"""
         try:
             if os.path.exists(self.mappings_file):
-                with open(self.mappings_file, 'r') as f:
+                with open(self.mappings_file, 'rb') as f:
+                    for line in f:
+                        if not line.strip():
+                            continue
+                        entry = orjson.loads(line)
+                        self._mapping_log_entries += 1
+                        if entry["op"] == "set":
+                            self.download_to_torrent_map[entry["id"]] = entry["tid"]
+                        else:
+                            self.download_to_torrent_map.pop(entry["id"], None)
+            elif os.path.exists(self.legacy_mappings_file):
+                with open(self.legacy_mappings_file, 'rb') as f:
                     # Convert string keys back to integers
-                    string_mappings = json.load(f)
                     self.download_to_torrent_map = {
-                        int(k): v for k, v in string_mappings.items()
+                        int(k): v for k, v in orjson.loads(f.read()).items()
                     }
-                logger.info(f"Loaded {len(self.download_to_torrent_map)} torrent mappings")
+            logger.info(f"Loaded {len(self.download_to_torrent_map)} torrent mappings")
+            if self._mapping_log_entries != len(self.download_to_torrent_map):
+                self._mapping_log_entries = len(self.download_to_torrent_map)
+                self._write_torrent_mappings(True, self._mapping_snapshot())
         except Exception as e:
             logger.error(f"Failed to load torrent mappings: {e}")
             self.download_to_torrent_map = {}
 
-    def _save_torrent_mappings(self):
-        """Save torrent mappings to persistent storage"""
+    def _load_download_meta(self):
+        """Load every download's type once, paired with its torrent mapping"""
+        try:
+            with self._session() as db:
+                for download_id, download_type in db.execute(
+                    select(DownloadTable.id, DownloadTable.download_type)
+                ):
+                    self._download_meta[download_id] = (
+                        _DOWNLOAD_TYPES[download_type],
+                        self.download_to_torrent_map.get(download_id)
+                    )
+        except Exception as e:
+            logger.error(f"Failed to load download metadata: {e}")
+            self._download_meta = {}
+
+    def _append_torrent_mapping(self, op: str, download_id: int, torrent_id: Optional[str] = None):
+        """Queue a single mapping change for the mapping log"""
+        entry = {"op": op, "id": download_id}
+        if torrent_id is not None:
+            entry["tid"] = torrent_id
+        self._pending_mappings.append(orjson.dumps(entry, option=orjson.OPT_APPEND_NEWLINE))
+        self._mapping_log_entries += 1
+        
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._flush_torrent_mappings()
+            return
+        # Coalesce bursts of changes into one write
+        if self._mapping_flush_task is None or self._mapping_flush_task.done():
+            self._mapping_flush_task = loop.create_task(self._flush_torrent_mappings_soon())
+
+    async def _flush_torrent_mappings_soon(self):
+        """Write queued mapping changes once the coalescing window has passed"""
+        await asyncio.sleep(MAPPING_FLUSH_DELAY)
+        # Collect the changes on the event loop, then do the file I/O in a worker thread.
+        # Appends don't schedule a new flush while this task runs, so keep writing
+        # until nothing was queued during the previous write.
+        while True:
+            await asyncio.to_thread(self._write_torrent_mappings, *self._take_mapping_write())
+            if not self._pending_mappings:
+                return
+
+    def _flush_torrent_mappings(self):
+        """Write queued mapping changes synchronously"""
+        self._write_torrent_mappings(*self._take_mapping_write())
+
+    def _take_mapping_write(self) -> Tuple[bool, bytes]:
+        """Take queued changes as (replace, data), compacting the log when it has grown stale"""
+        # Rewrite once superseded entries outnumber live mappings
+        if self._mapping_log_entries > 2 * len(self.download_to_torrent_map) + MAPPING_LOG_COMPACT_SLACK:
+            # The snapshot already reflects every queued change
+            self._pending_mappings = []
+            self._mapping_log_entries = len(self.download_to_torrent_map)
+            return True, self._mapping_snapshot()
+        data = b"".join(self._pending_mappings)
+        self._pending_mappings = []
+        return False, data
+
+    def _mapping_snapshot(self) -> bytes:
+        """Serialize one log entry per live mapping"""
+        return b"".join(
+            orjson.dumps(
+                {"op": "set", "id": download_id, "tid": torrent_id},
+                option=orjson.OPT_APPEND_NEWLINE
+            )
+            for download_id, torrent_id in self.download_to_torrent_map.items()
+        )
+
+    def _write_torrent_mappings(self, replace: bool, data: bytes):
+        """Append data to the mapping log, or atomically replace the log with it"""
+        if not replace and not data:
+            return
         try:
             os.makedirs(os.path.dirname(self.mappings_file), exist_ok=True)
-            # Convert integer keys to strings for JSON serialization
-            string_mappings = {str(k): v for k, v in self.download_to_torrent_map.items()}
-            with open(self.mappings_file, 'w') as f:
-                json.dump(string_mappings, f)
+            if replace:
+                tmp_file = f"{self.mappings_file}.tmp"
+                with open(tmp_file, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp_file, self.mappings_file)
+            else:
+                with open(self.mappings_file, 'ab') as f:
+                    f.write(data)
         except Exception as e:
             logger.error(f"Failed to save torrent mappings: {e}")
 
+    async def aclose(self):
+        """Flush queued mapping changes immediately, e.g. on shutdown"""
+        # Let an in-flight flush finish rather than racing its threaded write
+        if self._mapping_flush_task and not self._mapping_flush_task.done():
+            try:
+                await self._mapping_flush_task
+            except Exception as e:
+                logger.error(f"Failed to flush torrent mappings: {e}")
+        self._flush_torrent_mappings()
+
     def set_torrent_downloader(self, torrent_downloader):
         """Inject the torrent downloader service"""
         self.torrent_downloader = torrent_downloader
@@ -52,9 +222,93 @@ class DownloadService:
         """Inject the NZB downloader service"""
         self.nzb_downloader = nzb_downloader
 
-    def _get_db(self) -> Session:
-        """Get database session"""
-        return SessionLocal()
+    @contextmanager
+    def _session(self) -> Iterator[Session]:
+        """Yield a pooled database session, rolling back on error and always closing it"""
+        db = SessionLocal()
+        try:
+            yield db
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    async def _set_status(
+        self,
+        download_id: int,
+        status: DownloadStatus,
+        torrent_action: Callable[[str], Awaitable[Any]]
+    ) -> Optional[Download]:
+        """Apply a torrent-side action, then persist the new status with a single UPDATE
+
+        No session is held while the torrent client is awaited, so a slow client
+        neither locks the row nor keeps a pooled connection checked out.
+        """
+        with self._session() as db:
+            row = db.execute(
+                select(*_DOWNLOAD_COLUMNS).where(DownloadTable.id == download_id)
+            ).mappings().first()
+        if row is None:
+            return None
+        download = self._row_to_model(row)
+        
+        torrent_id = self.download_to_torrent_map.get(download_id)
+        if (self.torrent_downloader and
+            download.download_type == DownloadType.TORRENT and
+            torrent_id):
+            try:
+                torrent_info = self._torrent_status(torrent_id)
+                if torrent_info:
+                    self._apply_torrent_info(download, torrent_info)
+            except Exception:
+                pass  # Continue if we can't get torrent status
+            try:
+                await torrent_action(torrent_id)
+                self._forget_torrent_status(torrent_id)
+            except Exception:
+                pass  # Continue with database update even if the torrent action fails
+        
+        with self._session() as db:
+            updated = db.execute(
+                update(DownloadTable)
+                .where(DownloadTable.id == download_id)
+                .values(status=status)
+                .returning(DownloadTable.updated_at)
+                .execution_options(synchronize_session=False)
+            ).first()
+            db.commit()
+        if updated is None:
+            return None  # Deleted while the torrent client was busy
+        download.status = status
+        download.updated_at = updated.updated_at
+        return download
+
+    def _torrent_status(self, torrent_id: str):
+        """Get a torrent's status, reusing a lookup already made in this request"""
+        cache = _torrent_status_cache.get()
+        if cache is None:
+            return self.torrent_downloader.get_torrent_status(torrent_id)
+        if torrent_id not in cache:
+            cache[torrent_id] = self.torrent_downloader.get_torrent_status(torrent_id)
+        return cache[torrent_id]
+
+    def _forget_torrent_status(self, torrent_id: str) -> None:
+        """Drop a memoized status after the torrent's state changes"""
+        cache = _torrent_status_cache.get()
+        if cache is not None:
+            cache.pop(torrent_id, None)
+
+    def _apply_torrent_info(self, download: Download, torrent_info) -> None:
+        """Overlay live torrent progress, speed and status onto a download"""
+        download.progress = torrent_info.progress
+        download.speed = torrent_info.download_rate
+        # Explicit torrent states win, then completion, else keep the stored status
+        download.status = (
+            _TORRENT_STATE_MAP.get(torrent_info.status)
+            or _TORRENT_COMPLETION_STATUS[torrent_info.progress >= 100]
+            or download.status
+        )
 
     def _download_table_to_model(self, download_table: DownloadTable) -> Download:
         """Convert database table object to Pydantic model"""
@@ -62,19 +316,27 @@ class DownloadService:
             id=download_table.id,
             name=download_table.name,
             url=download_table.url,
-            status=DownloadStatus(download_table.status),
+            status=_DOWNLOAD_STATUSES[download_table.status],
             progress=download_table.progress,
-            download_type=DownloadType(download_table.download_type),
+            download_type=_DOWNLOAD_TYPES[download_table.download_type],
             download_path=download_table.download_path,
             speed=download_table.speed,
             eta=download_table.eta,
             error_message=download_table.error_message,
+            queue_position=download_table.queue_position,
             tags=[],  # TODO: Load tags from relationship
             queued_at=download_table.queued_at,
             created_at=download_table.created_at,
             updated_at=download_table.updated_at
         )
 
+    def _row_to_model(self, row) -> Download:
+        """Build a Pydantic model from a trusted database row without re-validating it"""
+        values = dict(row)
+        values["status"] = _DOWNLOAD_STATUSES[values["status"]]
+        values["download_type"] = _DOWNLOAD_TYPES[values["download_type"]]
+        return Download.model_construct(tags=[], **values)
+
     def _model_to_download_table(self, download: Download) -> DownloadTable:
         """Convert Pydantic model to database table object"""
         return DownloadTable(
@@ -94,8 +356,7 @@ class DownloadService:
 
     async def add_torrent(self, magnet_link: str, download_path: str) -> Download:
         """Add a torrent download and start downloading"""
-        db = self._get_db()
-        try:
+        with self._session() as db:
             # Create new download record
             download_table = DownloadTable(
                 url=magnet_link,
@@ -105,9 +366,7 @@ class DownloadService:
                 download_type=DownloadType.TORRENT.value,
                 download_path=download_path or "./downloads",
                 speed=0.0,
-                eta="",
-                created_at=datetime.utcnow(),
-                updated_at=datetime.utcnow()
+                eta=""
             )
             
             db.add(download_table)
@@ -115,6 +374,7 @@ class DownloadService:
             db.refresh(download_table)
             
             download = self._download_table_to_model(download_table)
+            self._download_meta[download.id] = (DownloadType.TORRENT, None)
             
             # Start actual torrent download if torrent downloader is available
             if self.torrent_downloader and magnet_link.startswith('magnet:'):
@@ -126,7 +386,8 @@ class DownloadService:
                     
                     # Map download ID to torrent ID and persist
                     self.download_to_torrent_map[download.id] = torrent_id
-                    self._save_torrent_mappings()
+                    self._append_torrent_mapping("set", download.id, torrent_id)
+                    self._download_meta[download.id] = (DownloadType.TORRENT, torrent_id)
                     
                     # Update download with torrent name and start downloading
                     torrent_info = self.torrent_downloader.get_torrent_status(torrent_id)
@@ -148,36 +409,36 @@ class DownloadService:
                     db.commit()
             
             return download
-        finally:
-            db.close()
 
     
-    def _extract_nzb_name(self, nzb_content: str, filename: str = None) -> str:
+    def _extract_nzb_name(self, nzb_content: Union[str, bytes], filename: str = None) -> str:
         """Extract a meaningful name from NZB content or filename"""
         try:
             import xml.etree.ElementTree as ET
             
-            # Try to parse NZB content to get the title
-            root = ET.fromstring(nzb_content)
-            
-            # Look for title in meta tags
-            for meta in root.findall('.//{http://www.newzbin.com/DTD/2003/nzb}meta'):
-                if meta.get('type') == 'title':
-                    title = meta.text
-                    if title and title.strip():
-                        return title.strip()
-            
-            # Look for subject in the first file
-            for file_elem in root.findall('.//{http://www.newzbin.com/DTD/2003/nzb}file'):
-                subject = file_elem.get('subject')
-                if subject:
-                    # Clean up the subject line to extract the actual name
-                    # Remove common patterns like [01/15], (1/15), etc.
-                    cleaned = re.sub(r'\[\d+/\d+\]|\(\d+/\d+\)', '', subject)
-                    cleaned = re.sub(r'"([^"]+)"', r'\1', cleaned)  # Remove quotes
-                    cleaned = cleaned.strip()
-                    if cleaned:
-                        return cleaned
+            # Stream the NZB and stop at the first usable name: the <head> metadata
+            # precedes the file list, so the thousands of segments are never parsed
+            source = BytesIO(nzb_content) if isinstance(nzb_content, bytes) else StringIO(nzb_content)
+            for event, elem in ET.iterparse(source, events=("start", "end")):
+                if event == "end" and elem.tag == _NZB_META_TAG:
+                    # Look for title in meta tags
+                    if elem.get('type') == 'title':
+                        title = elem.text
+                        if title and title.strip():
+                            return title.strip()
+                elif event == "start" and elem.tag == _NZB_FILE_TAG:
+                    # Look for subject in the first file
+                    subject = elem.get('subject')
+                    if subject:
+                        # Clean up the subject line to extract the actual name
+                        # Remove common patterns like [01/15], (1/15), etc.
+                        cleaned = _NZB_PART_COUNTER_RE.sub('', subject)
+                        cleaned = _NZB_QUOTED_RE.sub(r'\1', cleaned)  # Remove quotes
+                        cleaned = cleaned.strip()
+                        if cleaned:
+                            return cleaned
+                elif event == "end" and elem.tag == _NZB_FILE_TAG:
+                    elem.clear()
                         
         except Exception:
             pass
@@ -192,10 +453,9 @@ class DownloadService:
         return f"NZB {datetime.now().strftime('%H:%M:%S')}"
 
 
-    async def add_nzb(self, nzb_content, download_path: str, filename: str = None) -> Download:
+    async def add_nzb(self, nzb_content: Union[str, bytes], download_path: str, filename: str = None) -> Download:
         """Add an NZB download"""
-        db = self._get_db()
-        try:
+        with self._session() as db:
             # Create new download record
             download_table = DownloadTable(
                 url=f"nzb_content_{datetime.now().strftime('%Y%m%d_%H%M%S')}",
@@ -205,9 +465,7 @@ class DownloadService:
                 download_type=DownloadType.NZB.value,
                 download_path=download_path or "./downloads",
                 speed=0.0,
-                eta="",
-                created_at=datetime.utcnow(),
-                updated_at=datetime.utcnow()
+                eta=""
             )
             
             db.add(download_table)
@@ -215,6 +473,7 @@ class DownloadService:
             db.refresh(download_table)
             
             download = self._download_table_to_model(download_table)
+            self._download_meta[download.id] = (DownloadType.NZB, None)
             
             # Start NZB download if downloader is available
             if self.nzb_downloader:
@@ -242,14 +501,10 @@ class DownloadService:
                     download.error_message = str(e)
             
             return download
-        finally:
-            db.close()
-            db.close()
 
     async def get_download(self, download_id: int) -> Optional[Download]:
         """Get a download by ID"""
-        db = self._get_db()
-        try:
+        with self._session() as db:
             download_table = db.query(DownloadTable).filter(DownloadTable.id == download_id).first()
             if download_table:
                 download = self._download_table_to_model(download_table)
@@ -260,82 +515,80 @@ class DownloadService:
                     download_id in self.download_to_torrent_map):
                     try:
                         torrent_id = self.download_to_torrent_map[download_id]
-                        torrent_info = self.torrent_downloader.get_torrent_status(torrent_id)
+                        torrent_info = self._torrent_status(torrent_id)
                         if torrent_info:
-                            download.progress = torrent_info.progress
-                            download.speed = torrent_info.download_rate
-                            # Update status if different
-                            if torrent_info.status == "downloading":
-                                download.status = DownloadStatus.DOWNLOADING
-                            elif torrent_info.status == "paused":
-                                download.status = DownloadStatus.PAUSED
-                            elif torrent_info.progress >= 100:
-                                download.status = DownloadStatus.COMPLETED
+                            self._apply_torrent_info(download, torrent_info)
                     except Exception:
                         pass  # Continue if we can't get torrent status
                 
                 return download
             return None
-        finally:
-            db.close()
 
     async def get_all_downloads(self) -> List[Download]:
-        """Get all downloads"""
-        db = self._get_db()
-        try:
-            download_tables = db.query(DownloadTable).all()
-            downloads = [self._download_table_to_model(dt) for dt in download_tables]
-            
-            # Update progress from torrent downloader if available
-            if self.torrent_downloader:
-                for download in downloads:
-                    if (download.download_type == DownloadType.TORRENT and 
-                        download.id in self.download_to_torrent_map):
-                        try:
-                            torrent_id = self.download_to_torrent_map[download.id]
-                            torrent_info = self.torrent_downloader.get_torrent_status(torrent_id)
-                            if torrent_info:
-                                download.progress = torrent_info.progress
-                                download.speed = torrent_info.download_rate
-                                # Update status if different
-                                if torrent_info.status == "downloading":
-                                    download.status = DownloadStatus.DOWNLOADING
-                                elif torrent_info.status == "paused":
-                                    download.status = DownloadStatus.PAUSED
-                                elif torrent_info.progress >= 100:
-                                    download.status = DownloadStatus.COMPLETED
-                        except Exception:
-                            pass  # Continue if we can't get torrent status
-            
-            return downloads
-        finally:
-            db.close()
+        """Get all downloads in queue order, unpositioned ones last by age"""
+        # Fetch live torrent status up front with one bulk lookup so each row is
+        # built with its overrides already applied in a single pass
+        statuses = {}
+        if self.torrent_downloader and self.download_to_torrent_map:
+            try:
+                statuses = self.torrent_downloader.get_statuses(
+                    list(self.download_to_torrent_map.values())
+                )
+            except Exception:
+                statuses = {}  # Continue if we can't get torrent status
+            cache = _torrent_status_cache.get()
+            if cache is not None:
+                cache.update(statuses)
+        
+        downloads = []
+        with self._session() as db:
+            rows = db.execute(
+                select(*_DOWNLOAD_COLUMNS)
+                .order_by(
+                    # NULLS LAST spelled portably; MySQL and older SQLite lack the clause
+                    DownloadTable.queue_position.is_(None),
+                    DownloadTable.queue_position,
+                    DownloadTable.id
+                )
+                .execution_options(yield_per=DOWNLOAD_LIST_YIELD_PER)
+            ).mappings()
+            for row in rows:
+                download = self._row_to_model(row)
+                if download.download_type == DownloadType.TORRENT:
+                    torrent_info = statuses.get(self.download_to_torrent_map.get(download.id))
+                    if torrent_info:
+                        self._apply_torrent_info(download, torrent_info)
+                downloads.append(download)
+        
+        return downloads
 
     async def update_download(self, download: Download) -> Download:
-        """Update a download in the database"""
-        db = self._get_db()
-        try:
-            download_table = db.query(DownloadTable).filter(DownloadTable.id == download.id).first()
-            if download_table:
-                download_table.name = download.name
-                download_table.status = download.status.value
-                download_table.progress = download.progress
-                download_table.speed = download.speed
-                download_table.eta = download.eta
-                download_table.queued_at = download.queued_at
-                download_table.updated_at = datetime.utcnow()
-                
-                db.commit()
-                db.refresh(download_table)
-                return self._download_table_to_model(download_table)
+        """Update a download in the database with a single UPDATE"""
+        with self._session() as db:
+            result = db.execute(
+                update(DownloadTable)
+                .where(DownloadTable.id == download.id)
+                .values(
+                    name=download.name,
+                    status=download.status,
+                    progress=download.progress,
+                    speed=download.speed,
+                    eta=download.eta,
+                    error_message=download.error_message,
+                    queued_at=download.queued_at
+                )
+                .returning(DownloadTable.updated_at)
+                .execution_options(synchronize_session=False)
+            )
+            row = result.first()
+            db.commit()
+            if row is not None:
+                download.updated_at = row.updated_at
             return download
-        finally:
-            db.close()
 
     async def delete_download(self, download_id: int) -> bool:
         """Delete a download"""
-        db = self._get_db()
-        try:
+        with self._session() as db:
             download_table = db.query(DownloadTable).filter(DownloadTable.id == download_id).first()
             if download_table:
                 # Remove from torrent downloader if it's a torrent
@@ -346,19 +599,39 @@ class DownloadService:
                         torrent_id = self.download_to_torrent_map[download_id]
                         self.torrent_downloader.remove_download(torrent_id, False)
                         del self.download_to_torrent_map[download_id]
-                        self._save_torrent_mappings()
+                        self._append_torrent_mapping("del", download_id)
                     except Exception:
                         pass  # Continue even if torrent removal fails
                 
                 db.delete(download_table)
                 db.commit()
+                self._download_meta.pop(download_id, None)
                 return True
             return False
-        finally:
-            db.close()
 
     async def get_progress(self, download_id: int) -> Dict:
         """Get download progress"""
+        download_type, torrent_id = self._download_meta.get(download_id, (None, None))
+        if self.torrent_downloader and download_type == DownloadType.TORRENT and torrent_id:
+            # Known torrent: read live progress and only the persisted ETA from the database
+            try:
+                torrent_info = self._torrent_status(torrent_id)
+                if torrent_info:
+                    with self._session() as db:
+                        eta = db.execute(
+                            select(DownloadTable.eta).where(DownloadTable.id == download_id)
+                        ).first()
+                    if eta is not None:
+                        return {
+                            "id": download_id,
+                            "progress": torrent_info.progress,
+                            "status": torrent_info.status,
+                            "speed": torrent_info.download_rate,
+                            "eta": eta[0]
+                        }
+            except Exception:
+                pass  # Fall back to the full lookup below
+
         download = await self.get_download(download_id)
         if download:
             # Try to get real-time progress from torrent downloader
@@ -367,7 +640,7 @@ class DownloadService:
                 download_id in self.download_to_torrent_map):
                 try:
                     torrent_id = self.download_to_torrent_map[download_id]
-                    torrent_info = self.torrent_downloader.get_torrent_status(torrent_id)
+                    torrent_info = self._torrent_status(torrent_id)
                     if torrent_info:
                         return {
                             "id": download.id,
@@ -400,43 +673,19 @@ class DownloadService:
                 return {"error": str(e)}
         return {"message": f"File priorities set for download {download_id}"}
 
-    async def pause_download(self, download_id: int) -> bool:
+    async def pause_download(self, download_id: int) -> Optional[Download]:
         """Pause a download"""
-        download = await self.get_download(download_id)
-        if download:
-            # Pause in torrent downloader if it's a torrent
-            if (self.torrent_downloader and 
-                download.download_type == DownloadType.TORRENT and
-                download_id in self.download_to_torrent_map):
-                try:
-                    torrent_id = self.download_to_torrent_map[download_id]
-                    await self.torrent_downloader.pause_download(torrent_id)
-                except Exception:
-                    pass  # Continue with database update even if torrent pause fails
-            
-            download.status = DownloadStatus.PAUSED
-            await self.update_download(download)
-            return True
-        return False
+        return await self._set_status(
+            download_id, DownloadStatus.PAUSED,
+            lambda torrent_id: self.torrent_downloader.pause_download(torrent_id)
+        )
 
-    async def resume_download(self, download_id: int) -> bool:
+    async def resume_download(self, download_id: int) -> Optional[Download]:
         """Resume a download"""
-        download = await self.get_download(download_id)
-        if download:
-            # Resume in torrent downloader if it's a torrent
-            if (self.torrent_downloader and 
-                download.download_type == DownloadType.TORRENT and
-                download_id in self.download_to_torrent_map):
-                try:
-                    torrent_id = self.download_to_torrent_map[download_id]
-                    await self.torrent_downloader.start_download(torrent_id)
-                except Exception:
-                    pass  # Continue with database update even if torrent resume fails
-            
-            download.status = DownloadStatus.DOWNLOADING
-            await self.update_download(download)
-            return True
-        return False
+        return await self._set_status(
+            download_id, DownloadStatus.DOWNLOADING,
+            lambda torrent_id: self.torrent_downloader.start_download(torrent_id)
+        )
 
     async def add_magnet_download(self, magnet_link: str, download_path: str) -> Download:
         """Add a magnet link download (alias for add_torrent)"""
@@ -444,8 +693,7 @@ class DownloadService:
     
     async def add_torrent_file(self, file_upload, download_path: str) -> Download:
         """Add a torrent file download"""
-        db = self._get_db()
-        try:
+        with self._session() as db:
             # Create new download record
             download_table = DownloadTable(
                 url=f"file://{file_upload.filename}",
@@ -455,9 +703,7 @@ class DownloadService:
                 download_type=DownloadType.TORRENT.value,
                 download_path=download_path or "./downloads",
                 speed=0.0,
-                eta="",
-                created_at=datetime.utcnow(),
-                updated_at=datetime.utcnow()
+                eta=""
             )
             
             db.add(download_table)
@@ -465,9 +711,8 @@ class DownloadService:
             db.refresh(download_table)
             
             # TODO: Implement actual torrent file processing
+            self._download_meta[download_table.id] = (DownloadType.TORRENT, None)
             return self._download_table_to_model(download_table)
-        finally:
-            db.close()
     
     async def remove_download(self, download_id: int, delete_files: bool = False) -> bool:
         """Remove a download (alias for delete_download)"""
@@ -492,6 +737,7 @@ class DownloadService:
                         old_torrent_id = self.download_to_torrent_map[download_id]
                         self.torrent_downloader.remove_download(old_torrent_id, False)
                         del self.download_to_torrent_map[download_id]
+                        self._download_meta[download_id] = (DownloadType.TORRENT, None)
                     except Exception:
                         pass  # Continue even if removal fails
                 
@@ -503,7 +749,8 @@ class DownloadService:
                     
                     # Map download ID to new torrent ID and persist
                     self.download_to_torrent_map[download_id] = torrent_id
-                    self._save_torrent_mappings()
+                    self._append_torrent_mapping("set", download_id, torrent_id)
+                    self._download_meta[download_id] = (DownloadType.TORRENT, torrent_id)
                     
                     # Update download status
                     download.status = DownloadStatus.DOWNLOADING
@@ -567,45 +814,38 @@ class DownloadService:
 
     async def cleanup_invalid_downloads(self) -> Dict[str, int]:
         """Clean up downloads with invalid or missing URLs"""
-        db = self._get_db()
-        try:
-            # Get all downloads
-            downloads = await self.get_all_downloads()
-            
-            fixed_count = 0
-            removed_count = 0
-            
-            for download in downloads:
-                needs_update = False
-                
-                # Fix empty or null URLs
-                if not download.url or download.url == "":
-                    if download.download_type == DownloadType.TORRENT:
-                        # Mark torrent downloads with empty URLs as failed
-                        download.status = DownloadStatus.FAILED
-                        needs_update = True
-                    elif download.download_type == DownloadType.NZB:
-                        # Set a placeholder for NZB downloads
-                        download.url = f"nzb_content_{download.id}"
-                        needs_update = True
-                
-                # Fix invalid magnet links for torrents
-                elif (download.download_type == DownloadType.TORRENT and 
-                      download.url and 
-                      not download.url.startswith('magnet:') and
-                      not download.url.startswith('nzb_content')):
-                    # Invalid torrent URL
-                    download.status = DownloadStatus.FAILED
-                    needs_update = True
-                
-                if needs_update:
-                    await self.update_download(download)
-                    fixed_count += 1
-            
-            return {
-                "fixed_downloads": fixed_count,
-                "removed_downloads": removed_count,
-                "message": f"Fixed {fixed_count} downloads"
-            }
-        finally:
-            db.close()
+        missing_url = or_(DownloadTable.url.is_(None), DownloadTable.url == "")
+        
+        with self._session() as db:
+            # Mark torrents with empty or non-magnet URLs as failed
+            failed = db.execute(
+                update(DownloadTable)
+                .where(
+                    DownloadTable.download_type == DownloadType.TORRENT,
+                    or_(
+                        missing_url,
+                        and_(
+                            not_(DownloadTable.url.startswith('magnet:')),
+                            not_(DownloadTable.url.startswith('nzb_content'))
+                        )
+                    )
+                )
+                .values(status=DownloadStatus.FAILED)
+                .execution_options(synchronize_session=False)
+            )
+            # Give NZB downloads with empty URLs a placeholder
+            placeholders = db.execute(
+                update(DownloadTable)
+                .where(DownloadTable.download_type == DownloadType.NZB, missing_url)
+                .values(url=literal('nzb_content_') + cast(DownloadTable.id, String))
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+            fixed_count = failed.rowcount + placeholders.rowcount
+        
+        removed_count = 0
+        return {
+            "fixed_downloads": fixed_count,
+            "removed_downloads": removed_count,
+            "message": f"Fixed {fixed_count} downloads"
+        }
@@ -7,12 +7,15 @@ logger = logging.getLogger(__name__)
 def handle_errors(error_message: str, return_value: Any = None) -> Callable:
     """Decorator to handle errors in service methods"""
     def decorator(func: Callable) -> Callable:
+        # Bound once per decorated function; the success path only pays for the await
+        log_exception = logger.exception
+        
         @wraps(func)
         async def wrapper(*args, **kwargs):
             try:
                 return await func(*args, **kwargs)
             except Exception as e:
-                logger.exception(f"{error_message}: {str(e)}")
+                log_exception("%s: %s", error_message, e)
                 return return_value
         return wrapper
     return decorator
@@ -3,15 +3,20 @@ Comprehensive error handling and categorization for NZB downloads
 """
 import asyncio
 import nntplib
+import platform
+import re
 import socket
 import ssl
 import time
 import logging
-from typing import Dict, Any, Optional, List, Callable
-from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Dict, Any, Mapping, Optional, List, Callable
+from dataclasses import dataclass, field, replace
 from enum import Enum
-from functools import wraps
+from functools import lru_cache, wraps
+from io import StringIO
 import xml.etree.ElementTree as ET
+import psutil
 
 logger = logging.getLogger(__name__)
 
@@ -31,18 +36,16 @@ class ErrorCategory(Enum):
     AUTHENTICATION = "authentication"
     UNKNOWN = "unknown"
 
-@dataclass
+_EMPTY_CONTEXT: Mapping[str, Any] = MappingProxyType({})
+
+@dataclass(frozen=True, slots=True)
 class ErrorInfo:
     category: ErrorCategory
     severity: ErrorSeverity
     description: str
     retriable: bool
     action: str
-    context: Dict[str, Any] = None
-
-    def __post_init__(self):
-        if self.context is None:
-            self.context = {}
+    context: Mapping[str, Any] = field(default_factory=lambda: _EMPTY_CONTEXT)
 
 # Comprehensive error categorization
 ERROR_PATTERNS = {
@@ -154,69 +157,80 @@ ERROR_PATTERNS = {
     )
 }
 
-def categorize_error(error: Exception, context: Dict = None) -> ErrorInfo:
-    """Categorize an error and provide recommended actions"""
-    if context is None:
-        context = {}
-    
-    error_str = str(error).lower()
-    error_type = type(error).__name__
-    
+# NNTP status codes lead the server response, so they can be read off the first three characters
+_NNTP_CODE_MAP = {code: ERROR_PATTERNS[code] for code in ("430", "480", "502")}
+
+# Classification rules in precedence order: the first rule with any alternative whose
+# substrings all occur in the lowercased message wins
+_ERROR_RULES = (
     # SSL/TLS errors (prioritize these checks)
-    if "ssl" in error_str and "eof" in error_str:
-        info = ERROR_PATTERNS["ssl_eof"]
-    elif "ssl" in error_str and ("closed" in error_str or "connection" in error_str):
-        info = ERROR_PATTERNS["ssl_eof"]
-    elif "tls" in error_str and ("closed" in error_str or "eof" in error_str):
-        info = ERROR_PATTERNS["ssl_eof"]
-    elif "_ssl.c" in error_str:
-        info = ERROR_PATTERNS["ssl_eof"]
-    elif "ssl" in error_str and "protocol" in error_str:
-        info = ERROR_PATTERNS["ssl_protocol"]
-    elif "ssl" in error_str or "certificate" in error_str:
-        info = ERROR_PATTERNS["ssl"]
+    ("ssl_eof", (
+        {"ssl", "eof"}, {"ssl", "closed"}, {"ssl", "connection"},
+        {"tls", "closed"}, {"tls", "eof"}, {"_ssl.c"}
+    )),
+    ("ssl_protocol", ({"ssl", "protocol"},)),
+    ("ssl", ({"ssl"}, {"certificate"})),
     # NNTP errors
-    elif "430" in error_str or "no such article" in error_str:
-        info = ERROR_PATTERNS["430"]
-    elif "480" in error_str or "authentication" in error_str:
-        info = ERROR_PATTERNS["480"]
-    elif "502" in error_str or "permission denied" in error_str:
-        info = ERROR_PATTERNS["502"]
+    ("430", ({"430"}, {"no such article"})),
+    ("480", ({"480"}, {"authentication"})),
+    ("502", ({"502"}, {"permission denied"})),
     # Network errors
-    elif "timeout" in error_str or error_type == "timeout":
-        info = ERROR_PATTERNS["timeout"]
-    elif "name resolution" in error_str or "dns" in error_str:
-        info = ERROR_PATTERNS["dns"]
+    ("timeout", ({"timeout"},)),
+    ("dns", ({"name resolution"}, {"dns"})),
     # yEnc errors
-    elif "crc" in error_str:
-        info = ERROR_PATTERNS["yenc_crc"]
-    elif "ybegin" in error_str or "yend" in error_str:
-        info = ERROR_PATTERNS["yenc_headers"]
-    elif "incomplete" in error_str or "truncated" in error_str:
-        info = ERROR_PATTERNS["yenc_incomplete"]
+    ("yenc_crc", ({"crc"},)),
+    ("yenc_headers", ({"ybegin"}, {"yend"})),
+    ("yenc_incomplete", ({"incomplete"}, {"truncated"})),
     # File system errors
-    elif "no space" in error_str or "disk full" in error_str:
-        info = ERROR_PATTERNS["disk_space"]
-    elif "permission" in error_str and "denied" in error_str:
-        info = ERROR_PATTERNS["permission"]
+    ("disk_space", ({"no space"}, {"disk full"})),
+    ("permission", ({"permission", "denied"},)),
     # NZB format errors
-    elif "xml" in error_str and "invalid" in error_str:
-        info = ERROR_PATTERNS["nzb_invalid"]
-    elif "no files" in error_str or "empty" in error_str:
-        info = ERROR_PATTERNS["nzb_empty"]
-    # Default for unknown errors
-    else:
-        info = ErrorInfo(
-            category=ErrorCategory.UNKNOWN,
-            severity=ErrorSeverity.MEDIUM,
-            description=f"Unknown error: {error_str[:100]}",
-            retriable=True,
-            action="Generic retry with backoff"
-        )
+    ("nzb_invalid", ({"xml", "invalid"},)),
+    ("nzb_empty", ({"no files"}, {"empty"})),
+)
+
+# Every substring the rules test for, each checked once per message
+_ERROR_NEEDLES = frozenset(
+    needle for _, alternatives in _ERROR_RULES for alt in alternatives for needle in alt
+)
+
+@lru_cache(maxsize=1024)
+def _classify_cached(error_type: str, error_message: str) -> ErrorInfo:
+    """Map an error type and message to its shared ErrorInfo template"""
+    info = _NNTP_CODE_MAP.get(error_message[:3])
+    if info is not None:
+        return info
+    
+    error_str = error_message.lower()
+    
+    hits = {needle for needle in _ERROR_NEEDLES if needle in error_str}
+    if error_type == "timeout":
+        hits.add("timeout")
     
-    # Add context to error info
-    info.context.update(context)
-    return info
+    for key, alternatives in _ERROR_RULES:
+        if any(alt <= hits for alt in alternatives):
+            return ERROR_PATTERNS[key]
+    
+    # Default for unknown errors
+    return ErrorInfo(
+        category=ErrorCategory.UNKNOWN,
+        severity=ErrorSeverity.MEDIUM,
+        description=f"Unknown error: {error_str[:100]}",
+        retriable=True,
+        action="Generic retry with backoff"
+    )
+
+def categorize_error(error: Exception, context: Dict = None) -> ErrorInfo:
+    """Categorize an error and provide recommended actions"""
+    # Repeated failures (e.g. a run of 430s) hit the cache; templates are frozen
+    # and shared, so this call's context goes on a copy
+    return _with_context(_classify_cached(type(error).__name__, str(error)), context)
+
+def _with_context(info: ErrorInfo, context: Optional[Dict]) -> ErrorInfo:
+    """Return a copy of a shared ErrorInfo carrying a read-only copy of context"""
+    if not context:
+        return info
+    return replace(info, context=MappingProxyType(dict(context)))
 
 class NZBDownloadError(Exception):
     """Custom exception for NZB download errors"""
@@ -232,7 +246,12 @@ def handle_nntp_errors(func):
         try:
             return func(*args, **kwargs)
         except nntplib.NNTPError as e:
-            error_info = categorize_error(e, {"function": func.__name__})
+            # The response starts with the status code, so known codes skip the text scan
+            error_info = _NNTP_CODE_MAP.get(str(getattr(e, "response", ""))[:3])
+            if error_info is None:
+                error_info = categorize_error(e, {"function": func.__name__})
+            else:
+                error_info = _with_context(error_info, {"function": func.__name__})
             raise NZBDownloadError(f"NNTP error in {func.__name__}: {str(e)}", error_info, e)
         except (socket.timeout, socket.gaierror, socket.error) as e:
             error_info = categorize_error(e, {"function": func.__name__})
@@ -265,6 +284,10 @@ def handle_yenc_errors(func):
             raise NZBDownloadError(f"yEnc decoding error in {func.__name__}: {str(e)}", error_info, e)
     return wrapper
 
+# Literal \n, \t and \r sequences some clients send instead of real whitespace
+_ESCAPED_WHITESPACE_RE = re.compile(r'\\[ntr]')
+_UNESCAPED_WHITESPACE = {'\\n': '\n', '\\t': '\t', '\\r': '\r'}
+
 def validate_nzb_content(nzb_content: str) -> Dict[str, Any]:
     """Validate NZB content and provide diagnostic information"""
     diagnostics = {
@@ -277,56 +300,64 @@ def validate_nzb_content(nzb_content: str) -> Dict[str, Any]:
     }
     
     try:
-        # Handle escaped newlines in NZB content
-        if "\\n" in nzb_content:
-            nzb_content = nzb_content.replace("\\n", "\n")
-        if "\\t" in nzb_content:
-            nzb_content = nzb_content.replace("\\t", "\t")
-        if "\\r" in nzb_content:
-            nzb_content = nzb_content.replace("\\r", "\r")
+        # Handle escaped newlines in NZB content; clean content only pays for one scan
+        if "\\" in nzb_content:
+            nzb_content = _ESCAPED_WHITESPACE_RE.sub(
+                lambda m: _UNESCAPED_WHITESPACE[m.group()], nzb_content
+            )
             
-        # Parse XML
-        root = ET.fromstring(nzb_content)
+        # Stream the XML in one pass, keeping only the element being counted
+        source = StringIO(nzb_content)
+        root = None
+        file_tag = segment_tag = None
+        file_count = 0
+        total_segments = 0
+        total_size = 0
+        file_segments = 0
+        file_depth = 0
+        warnings = []
         
-        # Check if root element is 'nzb' (handle both with and without namespaces)
-        if not (root.tag == 'nzb' or root.tag.endswith('}nzb')):
-            diagnostics["errors"].append("Root element is not 'nzb'")
-            return diagnostics
+        for event, elem in ET.iterparse(source, events=("start", "end")):
+            if root is None:
+                root = elem
+                # Check if root element is 'nzb' (handle both with and without namespaces)
+                if not (root.tag == 'nzb' or root.tag.endswith('}nzb')):
+                    diagnostics["errors"].append("Root element is not 'nzb'")
+                    return diagnostics
+                
+                # Get namespace if present
+                namespace = ""
+                if '}' in root.tag:
+                    namespace = "{" + root.tag.split('}')[0].strip('{') + "}"
+                file_tag = f"{namespace}file"
+                segment_tag = f"{namespace}segment"
             
-        # Get namespace if present
-        namespace = ""
-        if '}' in root.tag:
-            namespace = "{" + root.tag.split('}')[0].strip('{') + "}"
+            elif event == "start" and elem.tag == file_tag:
+                file_count += 1
+                file_depth += 1
+                file_segments = 0
             
-        # Count files and segments (handle namespace)
-        file_tag = f"{namespace}file" if namespace else "file"
-        files = root.findall(f".//{file_tag}")
-        diagnostics["file_count"] = len(files)
+            elif event == "end" and elem.tag == segment_tag and file_depth:
+                file_segments += 1
+                total_segments += 1
+                # Estimate size from segment info
+                try:
+                    total_size += int(elem.get('bytes', 0))
+                except (ValueError, TypeError):
+                    warnings.append("Invalid segment size information")
+            
+            elif event == "end" and elem.tag == file_tag:
+                file_depth -= 1
+                if file_segments == 0:
+                    warnings.append(f"File '{elem.get('subject', 'unknown')}' has no segments")
+                elem.clear()
+        
+        diagnostics["file_count"] = file_count
+        diagnostics["warnings"].extend(warnings)
         
         if diagnostics["file_count"] == 0:
             diagnostics["errors"].append("No files found in NZB")
             return diagnostics
-            
-        total_segments = 0
-        total_size = 0
-        
-        for file_elem in files:
-            segment_tag = f"{namespace}segment" if namespace else "segment"
-            segments = file_elem.findall(f".//{segment_tag}")
-            segment_count = len(segments)
-            total_segments += segment_count
-            
-            if segment_count == 0:
-                diagnostics["warnings"].append(f"File '{file_elem.get('subject', 'unknown')}' has no segments")
-                continue
-                
-            # Estimate size from segment info
-            for segment in segments:
-                try:
-                    size = int(segment.get('bytes', 0))
-                    total_size += size
-                except (ValueError, TypeError):
-                    diagnostics["warnings"].append("Invalid segment size information")
         
         diagnostics["segment_count"] = total_segments
         diagnostics["size_estimate"] = total_size
@@ -454,44 +485,53 @@ class EnhancedRetryHandler:
                     
         raise last_error
 
+# Environment details that cannot change while the process runs
+_STATIC_DIAG: Mapping[str, Any] = MappingProxyType({
+    "platform": platform.platform(),
+    "python_version": platform.python_version(),
+})
+
 def collect_diagnostic_info() -> Dict[str, Any]:
     """Collect diagnostic information about the environment"""
-    import platform
-    import psutil
-    import socket
-    
     return {
-        "platform": platform.platform(),
-        "python_version": platform.python_version(),
+        **_STATIC_DIAG,
         "available_memory": psutil.virtual_memory().available,
         "disk_space": psutil.disk_usage('/').free,
-        "network_interfaces": [iface for iface in socket.if_nameindex()],
+        "network_interfaces": list(socket.if_nameindex()),
         "timestamp": time.time()
     }
 
+# Follow-up hint logged after an error, by category
+_SUGGESTIONS = {
+    ErrorCategory.AUTHENTICATION: "💡 Suggestion: Check your NNTP server credentials in the configuration",
+    ErrorCategory.NETWORK: "💡 Suggestion: Check your internet connection and DNS settings",
+    ErrorCategory.SSL_CONNECTION: "💡 Suggestion: SSL connection issue - will retry with fresh connection",
+    ErrorCategory.YENC_DECODING: "💡 Suggestion: This may indicate corrupt data - try downloading from a different server",
+    ErrorCategory.FILE_SYSTEM: "💡 Suggestion: Check available disk space and directory permissions",
+}
+
 def log_error_with_context(error: NZBDownloadError, additional_context: Dict = None):
     """Log error with comprehensive context and suggestions"""
-    context = error.error_info.context.copy()
+    # Nothing below is emitted unless ERROR is enabled, so skip building it
+    if not logger.isEnabledFor(logging.ERROR):
+        return
+    
+    context = dict(error.error_info.context)
     if additional_context:
         context.update(additional_context)
     
     logger.error(
-        f"[{error.error_info.category.value.upper()}] {error.error_info.description}\n"
-        f"Severity: {error.error_info.severity.value}\n"
-        f"Retriable: {error.error_info.retriable}\n"
-        f"Action: {error.error_info.action}\n"
-        f"Context: {context}\n"
-        f"Original Error: {error.original_error}"
+        "[%s] %s\nSeverity: %s\nRetriable: %s\nAction: %s\nContext: %s\nOriginal Error: %s",
+        error.error_info.category.value.upper(),
+        error.error_info.description,
+        error.error_info.severity.value,
+        error.error_info.retriable,
+        error.error_info.action,
+        context,
+        error.original_error
     )
     
     # Provide specific suggestions based on error category
-    if error.error_info.category == ErrorCategory.AUTHENTICATION:
-        logger.info("💡 Suggestion: Check your NNTP server credentials in the configuration")
-    elif error.error_info.category == ErrorCategory.NETWORK:
-        logger.info("💡 Suggestion: Check your internet connection and DNS settings")
-    elif error.error_info.category == ErrorCategory.SSL_CONNECTION:
-        logger.info("💡 Suggestion: SSL connection issue - will retry with fresh connection")
-    elif error.error_info.category == ErrorCategory.YENC_DECODING:
-        logger.info("💡 Suggestion: This may indicate corrupt data - try downloading from a different server")
-    elif error.error_info.category == ErrorCategory.FILE_SYSTEM:
-        logger.info("💡 Suggestion: Check available disk space and directory permissions")
+    suggestion = _SUGGESTIONS.get(error.error_info.category)
+    if suggestion:
+        logger.info(suggestion)
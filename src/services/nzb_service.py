@@ -1,12 +1,12 @@
 import re
 import xml.etree.ElementTree as ET
-from io import StringIO
+from io import BytesIO, StringIO
 import logging
 import os
 import nntplib
 import asyncio
 from dataclasses import dataclass
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Literal, Tuple, Union
 import importlib
 
 # Configure logging
@@ -22,6 +22,9 @@ except ImportError:
     YENC_AVAILABLE = False
     logger.warning("⚠️ yEnc decoder not available")
 
+# (True, decoded data) or (False, error category) for expected segment failures
+SegmentResult = Union[Tuple[Literal[True], bytes], Tuple[Literal[False], str]]
+
 @dataclass
 class NZBConfig:
     host: str
@@ -75,22 +78,23 @@ class NZBService:
             "server_errors": 0
         }
 
-    async def add_nzb_download(self, nzb_content: str, filename: str, download_path: str, download_id: int, db = None) -> bool:
+    async def add_nzb_download(self, nzb_content: Union[str, bytes], filename: str, download_path: str, download_id: int, db = None) -> bool:
         """Add a new NZB download job"""
         try:
             logger.debug(f"Parsing NZB content for {filename}", extra={"download_id": download_id})
-            tree = ET.parse(StringIO(nzb_content))
-            root = tree.getroot()
+            source = BytesIO(nzb_content) if isinstance(nzb_content, bytes) else StringIO(nzb_content)
             
-            # Extract segments
+            # Extract segments, dropping each file element once its segments are read
             segments = []
-            for file_elem in root.findall(".//{http://www.newzbin.com/DTD/2003/nzb}file"):
-                for seg in file_elem.findall(".//{http://www.newzbin.com/DTD/2003/nzb}segment"):
+            for _, elem in ET.iterparse(source):
+                if elem.tag == "{http://www.newzbin.com/DTD/2003/nzb}segment":
                     segments.append({
-                        "message_id": seg.text.strip(),
-                        "number": int(seg.get("number", 1)),
-                        "bytes": int(seg.get("bytes", 0))
+                        "message_id": elem.text.strip(),
+                        "number": int(elem.get("number", 1)),
+                        "bytes": int(elem.get("bytes", 0))
                     })
+                elif elem.tag == "{http://www.newzbin.com/DTD/2003/nzb}file":
+                    elem.clear()
             
             logger.info(f"Found {len(segments)} segments to download", extra={"download_id": download_id})
             if not segments:
@@ -266,16 +270,22 @@ class NZBService:
             )
         
         try:
-            return await self.retry_handler.retry_async(
+            ok, payload = await self.retry_handler.retry_async(
                 download_segment_inner
             )
         except Exception as e:
             error_info = categorize_error(e)
             logger.error(f"❌ Failed to download segment {segment_num} after retries: {e}")
             return None
+        # Expected failures were already logged and are not worth retrying
+        return payload if ok else None
+
+    def _download_segment_sync(self, message_id: str, segment_num: int, filename: str) -> SegmentResult:
+        """Synchronous segment download for thread executor
 
-    def _download_segment_sync(self, message_id: str, segment_num: int, filename: str) -> Optional[bytes]:
-        """Synchronous segment download for thread executor"""
+        Expected failures (missing article, undecodable data) come back as
+        (False, category) instead of raising, so they skip the retry loop.
+        """
         conn = None
         try:
             conn = self._get_connection()
@@ -305,21 +315,21 @@ class NZBService:
             
             if decoded_data:
                 logger.debug(f"✅ Downloaded segment {segment_num} ({len(decoded_data):,} bytes)")
-                return decoded_data
+                return True, decoded_data
             else:
                 logger.error(f"❌ Failed to decode segment {segment_num}")
                 self._update_stats("yenc_decode_failures")
-                return None
+                return False, "YENC_DECODE_ERROR"
                 
         except nntplib.NNTPError as e:
             error_code = str(e).split()[0] if str(e) else "unknown"
             
             if error_code.startswith("43"):  # Article not found
                 logger.warning(f"📰 Article not found for segment {segment_num}: {message_id}")
-            else:
-                logger.error(f"💥 NNTP error downloading segment {segment_num}: {e}")
-                self._update_stats("server_errors")
+                return False, "ARTICLE_NOT_FOUND"
             
+            logger.error(f"💥 NNTP error downloading segment {segment_num}: {e}")
+            self._update_stats("server_errors")
             raise NZBDownloadError("NNTP_ERROR", categorize_error(e), e)
             
         except Exception as e:
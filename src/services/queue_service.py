@@ -2,7 +2,6 @@ import asyncio
 from typing import List, Optional, Dict
 from datetime import datetime
 from ..models.tables import DownloadTable as Download, DownloadStatus, DownloadType
-from ..config import config
 
 class QueueManager:
     def __init__(self):
@@ -43,18 +42,18 @@ class QueueManager:
 
     async def pause_download(self, download_id: int) -> Optional[Download]:
         """Pause a download."""
-        success = await self.download_service.pause_download(download_id)
-        if success:
+        download = await self.download_service.pause_download(download_id)
+        if download:
             await self._process_queue()  # Start next download if slot available
-            return await self.download_service.get_download(download_id)
+            return download
         return None
 
     async def resume_download(self, download_id: int) -> Optional[Download]:
         """Resume a paused download."""
-        success = await self.download_service.resume_download(download_id)
-        if success:
+        download = await self.download_service.resume_download(download_id)
+        if download:
             await self._process_queue()
-            return await self.download_service.get_download(download_id)
+            return download
         return None
 
     async def _process_queue(self):
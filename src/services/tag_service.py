@@ -1,10 +1,9 @@
 import re
 from typing import List, Optional
 from datetime import datetime
-from ..models.download import Tag, Download
+from ..models.schemas import Tag, Download
 from ..models.tables import TagTable, download_tags
 from ..database import SessionLocal
-from ..config import config
 import os
 from sqlalchemy.orm import joinedload
 
@@ -232,7 +231,6 @@ class TagService:
                 download_table = db.query(DownloadTable).filter(DownloadTable.id == download.id).first()
                 if download_table:
                     download_table.download_path = tag_table.destination_folder
-                    download_table.updated_at = datetime.utcnow()
                     self.ensure_folder_exists(tag_table.destination_folder)
             
             db.commit()
@@ -1,4 +1,7 @@
-import logging\n\nlogger = logging.getLogger(__name__)\n
+import logging
+
+logger = logging.getLogger(__name__)
+
 """
 Real Torrent Service using libtorrent-python
 """
@@ -93,11 +96,11 @@ class TorrentDownloader:
             self.handles[download_id] = handle
             self.download_ids[info_hash] = download_id
             
-            print(f"✅ Added torrent: {download_id}")
+            logger.info(f"✅ Added torrent: {download_id}")
             return download_id
             
         except Exception as e:
-            print(f"❌ Error processing magnet link: {e}")
+            logger.error(f"❌ Error processing magnet link: {e}")
             raise Exception(f"Failed to process magnet link: {e}")
     
     async def _process_magnet_mock(self, magnet_link: str, save_path: str) -> str:
@@ -132,12 +135,36 @@ class TorrentDownloader:
         else:
             return self.torrent_info.get(download_id)
     
+    def get_statuses(self, download_ids: List[str]) -> Dict[str, TorrentInfo]:
+        """Get the status of several torrents in a single pass over the session"""
+        if not LIBTORRENT_AVAILABLE:
+            return {d: self.torrent_info[d] for d in download_ids if d in self.torrent_info}
+        
+        wanted = set(download_ids)
+        statuses: Dict[str, TorrentInfo] = {}
+        try:
+            for status in self.session.get_torrent_status(lambda s: True, 0):
+                download_id = self.download_ids.get(str(status.handle.info_hash()))
+                if download_id in wanted:
+                    info = self._build_torrent_info(download_id, status.handle, status)
+                    if info:
+                        statuses[download_id] = info
+        except Exception as e:
+            logger.error(f"❌ Error getting torrent statuses: {e}")
+        return statuses
+    
     def _get_status_real(self, download_id: str) -> Optional[TorrentInfo]:
         """Get real torrent status"""
         try:
             handle = self.handles[download_id]
-            status = handle.status()
-            
+            return self._build_torrent_info(download_id, handle, handle.status())
+        except Exception as e:
+            logger.error(f"❌ Error getting torrent status: {e}")
+            return None
+    
+    def _build_torrent_info(self, download_id: str, handle, status) -> Optional[TorrentInfo]:
+        """Convert a libtorrent handle and its status into a TorrentInfo"""
+        try:
             state_map = {
                 lt.torrent_status.downloading: "downloading",
                 lt.torrent_status.finished: "completed",
@@ -168,7 +195,7 @@ class TorrentDownloader:
             )
             
         except Exception as e:
-            print(f"❌ Error getting torrent status: {e}")
+            logger.error(f"❌ Error getting torrent status: {e}")
             return None
 
     def pause_torrent(self, download_id: str) -> bool:
@@ -29,6 +29,10 @@ class ServicesManager:
             self._download_service.set_nzb_downloader(self.get_nzb_downloader())
         return self._download_service
     
+    def get_existing_download_service(self) -> Optional[DownloadService]:
+        """Get the download service if it has been created, without creating it"""
+        return self._download_service
+    
     def get_queue_manager(self) -> QueueManager:
         """Get the singleton queue manager instance"""
         if self._queue_manager is None:
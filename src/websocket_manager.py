@@ -1,8 +1,8 @@
 from fastapi import WebSocket, WebSocketDisconnect
 from typing import List, Dict, Any, Optional
-import json
 import logging
 import asyncio
+import orjson
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
@@ -18,6 +18,9 @@ class ConnectionManager:
         self._connection_retries: Dict[WebSocket, int] = {}
         self.MAX_RETRIES = 3
         self.RETRY_DELAY = 1.0  # seconds
+        # Last system status frame, shared by every /ws/system client
+        self._latest_status: Optional[str] = None
+        self._status_cond = asyncio.Condition()
         
     async def connect(self, websocket: WebSocket, download_id: Optional[int] = None) -> bool:
         """Connect a WebSocket client with retry logic"""
@@ -51,7 +54,8 @@ class ConnectionManager:
         """Broadcast message to all connected clients with retry logic"""
         disconnected = []
         
-        for connection in self.active_connections:
+        # Iterate over a snapshot: clients can disconnect while a send is awaited
+        for connection in list(self.active_connections):
             try:
                 await connection.send_text(message)
                 self._connection_retries[connection] = 0  # Reset retry count on success
@@ -131,11 +135,28 @@ class ConnectionManager:
                         logger.error(f"Failed to manage queue for download_id {download_id}: {e}")
             
             # Broadcast to all connections
-            await self.broadcast(json.dumps(log_entry))
+            await self.broadcast(orjson.dumps(log_entry).decode())
             
         except Exception as e:
             logger.error(f"Error broadcasting download log: {e}")
         
+    async def publish_status(self, message: str):
+        """Publish a system status frame and wake every waiting client"""
+        async with self._status_cond:
+            self._latest_status = message
+            self._status_cond.notify_all()
+            
+    async def wait_for_status(self) -> str:
+        """Wait for the next published system status frame"""
+        async with self._status_cond:
+            await self._status_cond.wait()
+            return self._latest_status
+            
+    @property
+    def latest_status(self) -> Optional[str]:
+        """Most recently published system status frame, if any"""
+        return self._latest_status
+        
     def get_download_queue(self, download_id: int) -> asyncio.Queue:
         """Get or create download queue"""
         if download_id not in self._download_queues:
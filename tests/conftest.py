@@ -4,11 +4,10 @@ from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 from fastapi.testclient import TestClient
-from ..src.database import Base, get_db
-from ..src.models.tables import Download, Tag
-from ..src.models.enums import DownloadStatus, DownloadType, TagType
-from ..src.api import create_app
-from ..src.config import settings
+from src.database import Base, get_db
+from src.models.tables import Download, Tag
+from src.models.enums import DownloadStatus, DownloadType, TagType
+from src.config import settings
 from datetime import datetime
 
 # Use in-memory SQLite for testing
@@ -51,6 +50,8 @@ def db_session(engine):
 @pytest.fixture(scope="function")
 def client(db_session):
     """Create a test client with a clean database."""
+    from src.api import create_app
+
     app = create_app()
     
     # Override the get_db dependency
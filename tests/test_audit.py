@@ -1,8 +1,8 @@
 import pytest
 from fastapi import Request
 from datetime import datetime, timedelta
-from ..src.models.user import AuditLog
-from ..src.services.audit import (
+from src.models.user import AuditLog
+from src.services.audit import (
     create_audit_log,
     AuditLogger,
     get_audit_logs,
@@ -81,7 +81,8 @@ async def test_audit_logger_context_manager(db_session, mock_request):
     log = db_session.query(AuditLog).first()
     assert log is not None
     assert log.action == "UPDATE"
-    assert "success" in log.details
+    assert log.success is True
+    assert log.error is None
     assert "duration" in log.details
 
 async def test_audit_logger_with_error(db_session, mock_request):
@@ -103,8 +104,8 @@ async def test_audit_logger_with_error(db_session, mock_request):
     log = db_session.query(AuditLog).first()
     assert log is not None
     assert log.action == "DELETE"
-    assert "error" in log.details
-    assert "Test error" in log.details
+    assert log.success is False
+    assert log.error == "Test error"
 
 async def test_get_audit_logs_filtering(db_session, sample_audit_logs):
     """Test getting audit logs with filters"""
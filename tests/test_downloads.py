@@ -1,6 +1,14 @@
+import json
 import pytest
 from fastapi.testclient import TestClient
-from ..src.models.enums import DownloadStatus, DownloadType
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
+from src.database import Base
+from src.models.enums import DownloadStatus, DownloadType
+from src.models.tables import Download
+from src.routes.downloads import list_downloads
+from src.services import download_service as download_service_module
 
 def test_list_downloads(client, sample_download):
     """Test listing downloads endpoint"""
@@ -107,3 +115,68 @@ def test_invalid_download_id(client):
         response = client.get(endpoint)
         assert response.status_code == 404
         assert "not found" in response.json()["detail"].lower()
+
+def test_no_duplicate_routes(client):
+    """Test that no method and path is registered twice"""
+    seen = set()
+    for route in client.app.routes:
+        for method in getattr(route, "methods", None) or ():
+            key = (method, route.path)
+            assert key not in seen, f"Duplicate route: {method} {route.path}"
+            seen.add(key)
+
+@pytest.mark.asyncio
+async def test_download_service_returns_pooled_sessions(tmp_path, monkeypatch):
+    """Test that service calls check every pooled connection back in"""
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        connect_args={"check_same_thread": False},
+        poolclass=QueuePool
+    )
+    Base.metadata.create_all(bind=engine)
+    monkeypatch.setattr(
+        download_service_module, "SessionLocal",
+        sessionmaker(autocommit=False, autoflush=False, bind=engine, expire_on_commit=False)
+    )
+    monkeypatch.chdir(tmp_path)
+
+    service = download_service_module.DownloadService()
+    download = await service.add_nzb(b"<nzb/>", str(tmp_path), "test.nzb")
+    await service.get_all_downloads()
+    await service.get_download(download.id)
+    await service.get_download(9999)
+    await service.pause_download(download.id)
+    await service.delete_download(download.id)
+    await service.aclose()
+
+    assert engine.pool.checkedout() == 0
+
+@pytest.mark.asyncio
+async def test_cursor_pages_rows_created_in_the_same_second(tmp_path):
+    """Test that cursor pages over rows stamped within one second never repeat"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'paging.db'}")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine, expire_on_commit=False)()
+    db.add_all(
+        Download(
+            name=f"Download {i}",
+            download_type=DownloadType.TORRENT,
+            download_path="/downloads/test"
+        )
+        for i in range(5)
+    )
+    db.commit()
+
+    seen = []
+    cursor = None
+    for _ in range(5):
+        response = await list_downloads(
+            db=db, filter=None, sort=None, offset=0, limit=2, cursor=cursor
+        )
+        seen.extend(item["id"] for item in json.loads(response.body))
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+
+    db.close()
+    assert seen == [5, 4, 3, 2, 1]
@@ -1,6 +1,6 @@
 import pytest
 from fastapi.testclient import TestClient
-from ..src.models.enums import DownloadStatus, DownloadType
+from src.models.enums import DownloadStatus, DownloadType
 
 def test_get_queue(client, sample_download):
     """Test getting download queue"""
@@ -1,6 +1,6 @@
 import pytest
 from fastapi.testclient import TestClient
-from ..src.models.user import Role, User
+from src.models.user import Role, User
 from datetime import datetime
 
 @pytest.fixture
@@ -9,7 +9,7 @@ def test_role(db_session):
     role = Role(
         name="test_role",
         description="Test Role",
-        permissions="[]"
+        permissions=[]
     )
     db_session.add(role)
     db_session.commit()
@@ -85,7 +85,7 @@ def test_delete_role(client, admin_token, test_role):
         f"/api/roles/{test_role.id}",
         headers={"Authorization": f"Bearer {admin_token}"}
     )
-    assert response.status_code == 200
+    assert response.status_code == 204
     
     # Verify role is deleted
     response = client.get(
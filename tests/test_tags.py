@@ -1,6 +1,6 @@
 import pytest
 from fastapi.testclient import TestClient
-from ..src.models.enums import TagType
+from src.models.enums import TagType
 
 def test_list_tags(client, sample_tag):
     """Test listing tags endpoint"""
@@ -19,6 +19,14 @@ def test_list_tags_with_filter(client, sample_tag):
     assert len(data) == 1
     assert data[0]["tag_type"] == TagType.CUSTOM
 
+def test_list_tags_not_modified(client, sample_tag):
+    """Test conditional tag listing with ETag"""
+    response = client.get("/api/tags/")
+    etag = response.headers["etag"]
+    response = client.get("/api/tags/", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+
 def test_create_tag(client):
     """Test creating a new tag"""
     tag_data = {
@@ -58,7 +66,7 @@ def test_update_tag(client, sample_tag):
 def test_delete_tag(client, sample_tag):
     """Test deleting a tag"""
     response = client.delete(f"/api/tags/{sample_tag.id}")
-    assert response.status_code == 200
+    assert response.status_code == 204
     
     # Verify tag is deleted
     response = client.get(f"/api/tags/{sample_tag.id}")
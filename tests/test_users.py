@@ -1,8 +1,8 @@
 import pytest
 from fastapi.testclient import TestClient
 from datetime import datetime, timedelta
-from ..src.models.user import User, Role, APIKey, UserCreate, RoleCreate
-from ..src.auth import create_access_token, get_password_hash
+from src.models.user import User, Role, APIKey, UserCreate, RoleCreate
+from src.auth import create_access_token, get_password_hash, hash_api_key
 
 @pytest.fixture
 def admin_user(db_session):
@@ -143,12 +143,14 @@ def test_create_api_key(client, admin_token, normal_user):
     data = response.json()
     assert data["name"] == "Test Key"
     assert "key" in data
+    assert data["key_prefix"] == data["key"][:8]
 
 def test_list_api_keys(client, admin_token, normal_user, db_session):
     """Test listing API keys"""
     # Create API key
     api_key = APIKey(
-        key="testkey123",
+        key_prefix="testkey1",
+        key_hash=hash_api_key("testkey123"),
         name="Test Key",
         user_id=normal_user.id,
         scopes="[]"
@@ -164,12 +166,14 @@ def test_list_api_keys(client, admin_token, normal_user, db_session):
     data = response.json()
     assert len(data) == 1
     assert data[0]["name"] == "Test Key"
+    assert "key" not in data[0]
 
 def test_delete_api_key(client, admin_token, normal_user, db_session):
     """Test deleting API key"""
     # Create API key
     api_key = APIKey(
-        key="testkey123",
+        key_prefix="testkey1",
+        key_hash=hash_api_key("testkey123"),
         name="Test Key",
         user_id=normal_user.id,
         scopes="[]"
@@ -190,7 +194,7 @@ def test_delete_api_key(client, admin_token, normal_user, db_session):
 def test_assign_role(client, admin_token, normal_user, db_session):
     """Test assigning role to user"""
     # Create role
-    role = Role(name="test_role", permissions="[]")
+    role = Role(name="test_role", permissions=[])
     db_session.add(role)
     db_session.commit()
     
@@ -207,7 +211,7 @@ def test_assign_role(client, admin_token, normal_user, db_session):
 def test_remove_role(client, admin_token, normal_user, db_session):
     """Test removing role from user"""
     # Create and assign role
-    role = Role(name="test_role", permissions="[]")
+    role = Role(name="test_role", permissions=[])
     db_session.add(role)
     db_session.commit()
     normal_user.roles.append(role)
@@ -3,7 +3,8 @@ import json
 import asyncio
 from fastapi.testclient import TestClient
 from fastapi.websockets import WebSocket
-from ..src.models.enums import DownloadStatus, DownloadType
+from src.models.enums import DownloadStatus, DownloadType
+from src.routes.websocket import _conflate_updates
 
 def test_websocket_connection(client):
     """Test basic WebSocket connection"""
@@ -144,3 +145,19 @@ async def test_websocket_queue_limit(client):
         for _ in range(5):  # Check a few messages
             data = json.loads(websocket.receive_text())
             assert data["type"] in ["subscribed", "error"]
+
+def test_conflate_download_log_burst():
+    """Test a burst of queued download logs collapses to the latest DEBUG entry"""
+    burst = [
+        {"download_id": 1, "message": f"Downloading segment {i}/50", "level": "DEBUG"}
+        for i in range(1, 51)
+    ]
+    burst.insert(10, {"download_id": 1, "message": "Segment 10 download failed", "level": "WARNING"})
+    burst.append({"download_id": 1, "message": "Download complete", "level": "INFO"})
+    
+    updates = _conflate_updates(burst)
+    assert [update["message"] for update in updates] == [
+        "Segment 10 download failed",
+        "Downloading segment 50/50",
+        "Download complete"
+    ]